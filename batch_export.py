@@ -5,11 +5,40 @@ freeeから取引先一覧を取得し、AI処理用のCSV形式でエクスポ
 """
 
 import csv
+import json
+import operator
 import os
 import requests
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import closing
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from datetime import datetime
+from functools import partial
+from itertools import islice
+from collections.abc import Iterator
 from typing import TypedDict
 
+from constants import CSV_BUFFER_SIZE
+
+try:
+    import orjson
+    _json_loads = orjson.loads
+except ImportError:  # orjson は任意依存（未インストール時は標準ライブラリ）
+    _json_loads = json.loads
+
+
+# freee API の1ページあたりの取得件数
+PAGE_LIMIT = 100
+# 同時に取得するページ数の上限
+MAX_CONCURRENT_PAGES = 8
+
+# 都道府県コード → 都道府県名（簡易版、必要に応じて追加）
+_PREF_NAMES: dict[int, str] = {
+    1: "北海道", 13: "東京都", 14: "神奈川県", 23: "愛知県",
+    26: "京都府", 27: "大阪府", 28: "兵庫県", 40: "福岡県"
+}
+
 
 class PartnerExport(TypedDict):
     """エクスポートする取引先データ"""
@@ -43,78 +72,145 @@ class FreeePartnerExporter:
             "X-Api-Version": "2020-06-15"
         }
 
-    def get_partners(self, company_id: int) -> list[PartnerExport]:
+        # 接続を使い回すセッション（並列取得数ぶんのコネクションを保持）
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=MAX_CONCURRENT_PAGES,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429, 500, 502, 503, 504],
+                raise_on_status=False
+            )
+        ))
+
+    def _fetch_partner_page(self, company_id: int, offset: int) -> dict:
         """
-        freeeから取引先一覧を取得
+        取引先一覧を1ページ分取得
 
         Args:
             company_id: freee事業所ID
+            offset: 取得開始位置
 
         Returns:
-            取引先リスト
+            APIのレスポンス（partners と、あれば meta を含む）
         """
-        partners: list[PartnerExport] = []
-        offset = 0
-        limit = 100
-
-        while True:
-            params = {
-                "company_id": company_id,
-                "offset": offset,
-                "limit": limit
-            }
-
-            response = requests.get(
-                f"{self.base_url}/partners",
-                headers=self.headers,
-                params=params
-            )
+        params = {
+            "company_id": company_id,
+            "offset": offset,
+            "limit": PAGE_LIMIT
+        }
 
-            if response.status_code != 200:
-                raise Exception(f"API Error: {response.status_code} - {response.text}")
+        response = self._session.get(f"{self.base_url}/partners", params=params)
 
-            data = response.json()
-            batch = data.get("partners", [])
+        if response.status_code != 200:
+            raise Exception(f"API Error: {response.status_code} - {response.text}")
 
-            if not batch:
-                break
+        return _json_loads(response.content)
 
-            for p in batch:
-                partners.append({
-                    "id": p["id"],
-                    "name": p["name"],
-                    "shortcut1": p.get("shortcut1"),
-                    "shortcut2": p.get("shortcut2"),
-                    "long_name": p.get("long_name"),
-                    "corporate_number": p.get("corporate_number"),
-                    "invoice_registration_number": p.get("invoice_registration_number"),
-                    "address": self._format_address(p)
-                })
+    def _fetch_partner_batch(self, company_id: int, offset: int) -> list[dict]:
+        """1ページ分の取引先リスト（生データ）を取得"""
+        return self._fetch_partner_page(company_id, offset).get("partners", [])
 
-            offset += limit
+    def _to_export(self, partner: dict) -> PartnerExport:
+        """APIの取引先データをエクスポート形式に変換"""
+        return {
+            "id": partner["id"],
+            "name": partner["name"],
+            "shortcut1": partner.get("shortcut1"),
+            "shortcut2": partner.get("shortcut2"),
+            "long_name": partner.get("long_name"),
+            "corporate_number": partner.get("corporate_number"),
+            "invoice_registration_number": partner.get("invoice_registration_number"),
+            "address": self._format_address(partner)
+        }
 
-            # 取得件数がlimitより少なければ終了
-            if len(batch) < limit:
-                break
+    def iter_partners(self, company_id: int) -> Iterator[PartnerExport]:
+        """
+        freeeから取引先を順に取得するジェネレータ
 
-        return partners
+        最初のページを取得して続きがあるか確認し、以降のページは並列に取得する。
+        レスポンスに総件数（meta.total_count）があれば必要なページだけを、
+        なければ MAX_CONCURRENT_PAGES 件ずつ端数ページが出るまで取得する。
+        取引先はページ単位で順に返すため、全件をメモリに保持しない。
+
+        Args:
+            company_id: freee事業所ID
+
+        Yields:
+            取引先
+        """
+        first_page = self._fetch_partner_page(company_id, 0)
+        batch = first_page.get("partners", [])
+        yield from map(self._to_export, batch)
+
+        # 取得件数がlimitより少なければ終了
+        if len(batch) < PAGE_LIMIT:
+            return
+
+        fetch = partial(self._fetch_partner_batch, company_id)
+
+        with ThreadPoolExecutor(max_workers=MAX_CONCURRENT_PAGES) as executor:
+            # 総件数が分かる場合は残りのページだけを取得
+            total = (first_page.get("meta") or {}).get("total_count")
+            if isinstance(total, int):
+                for batch in executor.map(fetch, range(PAGE_LIMIT, total, PAGE_LIMIT)):
+                    yield from map(self._to_export, batch)
+                return
+
+            offset = PAGE_LIMIT
+            while True:
+                offsets = range(offset, offset + PAGE_LIMIT * MAX_CONCURRENT_PAGES, PAGE_LIMIT)
+                batches = executor.map(fetch, offsets)
+
+                # ページ順に返し、最初の端数ページで打ち切る
+                for batch in batches:
+                    yield from map(self._to_export, batch)
+                    if len(batch) < PAGE_LIMIT:
+                        return
+
+                offset += PAGE_LIMIT * MAX_CONCURRENT_PAGES
+
+    def iter_partners_missing_corp(
+        self,
+        company_id: int,
+        limit: int | None = None
+    ) -> Iterator[PartnerExport]:
+        """
+        法人番号が未設定の取引先を順に取得するジェネレータ
+
+        limit 件見つかった時点で以降のページは取得しない。
+
+        Args:
+            company_id: freee事業所ID
+            limit: 最大件数（省略時は全件）
+
+        Yields:
+            法人番号が未設定の取引先
+        """
+        with closing(self.iter_partners(company_id)) as partners:
+            missing = (p for p in partners if not p["corporate_number"])
+            yield from islice(missing, limit)
+
+    def get_partners(self, company_id: int) -> list[PartnerExport]:
+        """
+        freeeから取引先一覧を取得
+
+        Args:
+            company_id: freee事業所ID
+
+        Returns:
+            取引先リスト
+        """
+        return list(self.iter_partners(company_id))
 
     def _format_address(self, partner: dict) -> str | None:
         """住所をフォーマット"""
-        parts = []
-        if partner.get("pref_code"):
-            # 都道府県コードを名前に変換（簡易版）
-            pref_names = {
-                1: "北海道", 13: "東京都", 14: "神奈川県", 23: "愛知県",
-                26: "京都府", 27: "大阪府", 28: "兵庫県", 40: "福岡県"
-                # 必要に応じて追加
-            }
-            pref = pref_names.get(partner["pref_code"], f"都道府県{partner['pref_code']}")
-            parts.append(pref)
-        if partner.get("address1"):
-            parts.append(partner["address1"])
-        if partner.get("address2"):
-            parts.append(partner["address2"])
+        pref_code = partner.get("pref_code")
+        parts = [_PREF_NAMES.get(pref_code, f"都道府県{pref_code}")] if pref_code else []
+        parts += [partner[k] for k in ("address1", "address2") if partner.get(k)]
         return " ".join(parts) if parts else None
 
     def export_to_csv(
@@ -134,30 +230,34 @@ class FreeePartnerExporter:
         Returns:
             出力ファイルパス
         """
-        partners = self.get_partners(company_id)
+        partners = self.iter_partners(company_id)
 
         # フィルタリング
         if not include_with_corporate_number:
-            partners = [p for p in partners if not p["corporate_number"]]
+            partners = (p for p in partners if not p["corporate_number"])
 
         # 出力パス
         if not output_path:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"freee_partners_export_{timestamp}.csv"
 
-        # CSV出力
-        fieldnames = [
+        # CSV出力（取得しながら1件ずつ書き込む）
+        fieldnames = (
             "id", "name", "shortcut1", "shortcut2", "long_name",
             "corporate_number", "invoice_registration_number", "address"
-        ]
+        )
+        to_row = operator.itemgetter(*fieldnames)
 
-        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=fieldnames)
-            writer.writeheader()
-            writer.writerows(partners)
+        count = 0
+        with open(output_path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            for partner in partners:
+                writer.writerow(to_row(partner))
+                count += 1
 
         print(f"✅ エクスポート完了: {output_path}")
-        print(f"   取引先数: {len(partners)}件")
+        print(f"   取引先数: {count}件")
         if not include_with_corporate_number:
             print(f"   (法人番号未設定の取引先のみ)")
 
@@ -178,24 +278,27 @@ class FreeePartnerExporter:
         Returns:
             出力ファイルパス
         """
-        partners = self.get_partners(company_id)
-
-        # 法人番号がない取引先のみ
-        partners = [p for p in partners if not p["corporate_number"]]
+        # 法人番号がない取引先のみ（取得・絞り込み・書き込みを1件ずつ流す）
+        rows = (
+            (p["id"], p["name"], p["address"] or "")
+            for p in self.iter_partners_missing_corp(company_id)
+        )
 
         if not output_path:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"freee_partners_for_ai_{timestamp}.csv"
 
         # AI処理用のシンプルなCSV
-        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        with open(output_path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
             writer = csv.writer(f)
             writer.writerow(["id", "取引先名", "住所（参考）"])
-            for p in partners:
-                writer.writerow([p["id"], p["name"], p["address"] or ""])
+            count = 0
+            for row in rows:
+                writer.writerow(row)
+                count += 1
 
         print(f"✅ AI用エクスポート完了: {output_path}")
-        print(f"   取引先数: {len(partners)}件（法人番号未設定のみ）")
+        print(f"   取引先数: {count}件（法人番号未設定のみ）")
 
         return output_path
 
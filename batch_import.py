@@ -5,11 +5,52 @@ AIが出力したCSVをfreee形式に変換し、取引先情報を更新する
 """
 
 import csv
+import json
+import operator
 import os
-import requests
+import re
+import sys
+import time
+from collections import Counter
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from typing import TypedDict
 
+import requests
+from requests.adapters import HTTPAdapter
+
+from constants import CSV_BUFFER_SIZE, PRINT_BATCH_SIZE
+
+try:
+    import orjson
+    _json_dumps = orjson.dumps
+except ImportError:  # orjson は任意依存（未インストール時は標準ライブラリ）
+    def _json_dumps(obj: dict) -> bytes:
+        return json.dumps(obj).encode("utf-8")
+
+
+# レート制限（HTTP 429）時の最大リトライ回数
+MAX_RETRIES = 3
+# セッションが保持するコネクション数
+HTTP_POOL_SIZE = 10
+
+# 数字以外の文字
+_NON_DIGIT = re.compile(r"\D")
+
+# インポート対象外とする確信度
+_LOW_CONFIDENCE = frozenset({"low", "unknown"})
+
+# AI出力CSVのカラム名（英語 → 日本語）
+_AI_COLUMN_ALIASES: dict[str, str] = {
+    "original_name": "取引先名",
+    "official_name": "正式法人名",
+    "corporate_number": "法人番号",
+    "invoice_number": "インボイス登録番号",
+    "confidence": "確信度",
+    "notes": "備考"
+}
+
 
 class AIResult(TypedDict):
     """AIの出力結果"""
@@ -27,6 +68,7 @@ class UpdateResult(TypedDict):
     id: int
     name: str
     status: str  # success, skipped, error
+    reason: str  # error の原因: api_failed（更新APIが失敗を返した）, exception（例外）。それ以外は空
     message: str
 
 
@@ -37,6 +79,14 @@ class ImportConfig:
     skip_low_confidence: bool = True  # low/unknownの確信度をスキップ
     update_name: bool = False  # 取引先名も更新するか
     backup: bool = True  # 更新前にバックアップを作成
+    max_workers: int = 5  # 同時に実行する更新リクエスト数
+
+
+def _flush_lines(lines: list[str]) -> None:
+    """溜めた表示行をまとめて標準出力に書き出す"""
+    if lines:
+        sys.stdout.write("\n".join(lines) + "\n")
+        lines.clear()
 
 
 class FreeePartnerImporter:
@@ -60,6 +110,14 @@ class FreeePartnerImporter:
             "Content-Type": "application/json"
         }
 
+        # 接続を使い回すセッション
+        self._session = requests.Session()
+        self._session.headers.update(self.headers)
+        self._session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=HTTP_POOL_SIZE
+        ))
+
     def parse_ai_csv(self, csv_path: str) -> list[AIResult]:
         """
         AIが出力したCSVをパース
@@ -70,34 +128,47 @@ class FreeePartnerImporter:
         Returns:
             AIResultのリスト
         """
-        results: list[AIResult] = []
+        return list(self.iter_ai_csv(csv_path))
 
-        with open(csv_path, "r", encoding="utf-8-sig") as f:
+    def iter_ai_csv(self, csv_path: str) -> Iterator[AIResult]:
+        """
+        AIが出力したCSVを1行ずつパースするジェネレータ
+
+        Args:
+            csv_path: CSVファイルパス
+
+        Yields:
+            AIResult
+        """
+        with open(csv_path, "r", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
             reader = csv.DictReader(f)
 
+            # カラム名の正規化（日本語/英語両対応）: ヘッダーから一度だけ決定
+            fieldnames = reader.fieldnames or []
+            col = {
+                key: ja if ja in fieldnames else key
+                for key, ja in _AI_COLUMN_ALIASES.items()
+            }
+
             for row in reader:
-                # カラム名の正規化（日本語/英語両対応）
-                result: AIResult = {
+                yield {
                     "id": int(row.get("id", 0)),
-                    "original_name": row.get("取引先名", row.get("original_name", "")),
-                    "official_name": row.get("正式法人名", row.get("official_name")) or None,
+                    "original_name": row.get(col["original_name"], ""),
+                    "official_name": row.get(col["official_name"]) or None,
                     "corporate_number": self._normalize_corp_number(
-                        row.get("法人番号", row.get("corporate_number"))
+                        row.get(col["corporate_number"])
                     ),
-                    "invoice_number": row.get("インボイス登録番号", row.get("invoice_number")) or None,
-                    "confidence": row.get("確信度", row.get("confidence", "unknown")),
-                    "notes": row.get("備考", row.get("notes", ""))
+                    "invoice_number": row.get(col["invoice_number"]) or None,
+                    "confidence": row.get(col["confidence"], "unknown"),
+                    "notes": row.get(col["notes"], "")
                 }
-                results.append(result)
-
-        return results
 
     def _normalize_corp_number(self, value: str | None) -> str | None:
         """法人番号を正規化（13桁の数字のみ）"""
         if not value:
             return None
         # 数字のみ抽出
-        digits = "".join(c for c in str(value) if c.isdigit())
+        digits = _NON_DIGIT.sub("", str(value))
         if len(digits) == 13:
             return digits
         return None
@@ -115,20 +186,28 @@ class FreeePartnerImporter:
         valid: list[AIResult] = []
         invalid: list[AIResult] = []
 
-        for r in results:
-            if not r["id"]:
-                invalid.append(r)
-                continue
-            if not r["corporate_number"]:
-                invalid.append(r)
-                continue
-            if r["confidence"] in ["low", "unknown"]:
-                invalid.append(r)
-                continue
-            valid.append(r)
+        for is_valid, r in self.iter_validated(results):
+            (valid if is_valid else invalid).append(r)
 
         return valid, invalid
 
+    def iter_validated(self, results: Iterable[AIResult]) -> Iterator[tuple[bool, AIResult]]:
+        """
+        結果を1件ずつ検証するジェネレータ
+
+        Args:
+            results: AIResultのイテラブル
+
+        Yields:
+            (有効かどうか, AIResult)
+        """
+        for r in results:
+            yield bool(
+                r["id"]
+                and r["corporate_number"]
+                and r["confidence"] not in _LOW_CONFIDENCE
+            ), r
+
     def update_partner(
         self,
         company_id: int,
@@ -163,9 +242,66 @@ class FreeePartnerImporter:
         if name:
             payload["name"] = name
 
-        response = requests.put(url, headers=self.headers, json=payload)
+        # リトライ時も同じボディを使うため一度だけシリアライズする
+        # （Content-Type はセッションのヘッダーで指定済み）
+        body = _json_dumps(payload)
+
+        for attempt in range(MAX_RETRIES + 1):
+            response = self._session.put(url, data=body)
+            if response.status_code != 429 or attempt == MAX_RETRIES:
+                break
+            time.sleep(self._retry_delay(response, attempt))
+
         return response.status_code == 200
 
+    def _retry_delay(self, response: requests.Response, attempt: int) -> float:
+        """リトライまでの待機秒数（Retry-Afterヘッダー優先、なければ指数バックオフ）"""
+        retry_after = response.headers.get("Retry-After")
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return float(2 ** attempt)
+
+    def _update_one(
+        self,
+        company_id: int,
+        r: AIResult,
+        config: ImportConfig
+    ) -> UpdateResult:
+        """1件の取引先を更新し、結果を返す"""
+        try:
+            name_to_update = r["official_name"] if config.update_name else None
+            success = self.update_partner(
+                company_id=company_id,
+                partner_id=r["id"],
+                corporate_number=r["corporate_number"],
+                invoice_number=r["invoice_number"],
+                name=name_to_update
+            )
+        except Exception as e:
+            return {
+                "id": r["id"],
+                "name": r["original_name"],
+                "status": "error",
+                "reason": "exception",
+                "message": str(e)
+            }
+
+        if success:
+            return {
+                "id": r["id"],
+                "name": r["original_name"],
+                "status": "success",
+                "reason": "",
+                "message": f"法人番号: {r['corporate_number']}"
+            }
+        return {
+            "id": r["id"],
+            "name": r["original_name"],
+            "status": "error",
+            "reason": "api_failed",
+            "message": "API更新失敗"
+        }
+
     def import_results(
         self,
         company_id: int,
@@ -186,91 +322,81 @@ class FreeePartnerImporter:
         if config is None:
             config = ImportConfig()
 
-        results = self.parse_ai_csv(csv_path)
-        valid, invalid = self.validate_results(results)
-
+        valid: list[AIResult] = []
         update_results: list[UpdateResult] = []
+        total = 0
 
-        # 無効な結果をスキップとして記録
-        for r in invalid:
+        # CSVを読みながら検証し、無効な結果はその場でスキップとして記録
+        for is_valid, r in self.iter_validated(self.iter_ai_csv(csv_path)):
+            total += 1
+            if is_valid:
+                valid.append(r)
+                continue
             update_results.append({
                 "id": r["id"],
                 "name": r["original_name"],
                 "status": "skipped",
+                "reason": "",
                 "message": f"確信度: {r['confidence']}, 法人番号: {r['corporate_number'] or 'なし'}"
             })
 
         # 有効な結果を処理
-        print(f"\n📊 処理対象: {len(valid)}件 / 全{len(results)}件")
-        print(f"   スキップ: {len(invalid)}件（確信度低/法人番号なし）")
+        print(f"\n📊 処理対象: {len(valid)}件 / 全{total}件")
+        print(f"   スキップ: {len(update_results)}件（確信度低/法人番号なし）")
 
         if config.dry_run:
             print("\n⚠️  ドライランモード（実際には更新しません）")
 
-        for r in valid:
-            if config.dry_run:
+        # 表示は PRINT_BATCH_SIZE 件ごとにまとめて書き出す
+        lines: list[str] = []
+
+        if config.dry_run:
+            for i, r in enumerate(valid, 1):
                 # ドライラン: 更新内容を表示するのみ
-                print(f"\n[DRY RUN] ID={r['id']}")
-                print(f"  取引先名: {r['original_name']}")
-                print(f"  → 法人番号: {r['corporate_number']}")
+                lines.append(f"\n[DRY RUN] ID={r['id']}")
+                lines.append(f"  取引先名: {r['original_name']}")
+                lines.append(f"  → 法人番号: {r['corporate_number']}")
                 if r["invoice_number"]:
-                    print(f"  → インボイス: {r['invoice_number']}")
+                    lines.append(f"  → インボイス: {r['invoice_number']}")
                 if r["official_name"] and config.update_name:
-                    print(f"  → 正式名称: {r['official_name']}")
+                    lines.append(f"  → 正式名称: {r['official_name']}")
 
                 update_results.append({
                     "id": r["id"],
                     "name": r["original_name"],
                     "status": "success",
+                    "reason": "",
                     "message": "ドライラン完了"
                 })
-            else:
-                # 実際に更新
-                try:
-                    name_to_update = r["official_name"] if config.update_name else None
-                    success = self.update_partner(
-                        company_id=company_id,
-                        partner_id=r["id"],
-                        corporate_number=r["corporate_number"],
-                        invoice_number=r["invoice_number"],
-                        name=name_to_update
-                    )
-
-                    if success:
-                        update_results.append({
-                            "id": r["id"],
-                            "name": r["original_name"],
-                            "status": "success",
-                            "message": f"法人番号: {r['corporate_number']}"
-                        })
-                        print(f"✅ 更新成功: {r['original_name']}")
+                if i % PRINT_BATCH_SIZE == 0:
+                    _flush_lines(lines)
+        else:
+            # 実際に更新（並列実行し、結果は入力順に表示）
+            with ThreadPoolExecutor(max_workers=config.max_workers) as executor:
+                outcomes = executor.map(
+                    lambda r: self._update_one(company_id, r, config),
+                    valid
+                )
+                for i, result in enumerate(outcomes, 1):
+                    update_results.append(result)
+                    if result["status"] == "success":
+                        lines.append(f"✅ 更新成功: {result['name']}")
+                    elif result["reason"] == "api_failed":
+                        lines.append(f"❌ 更新失敗: {result['name']}")
                     else:
-                        update_results.append({
-                            "id": r["id"],
-                            "name": r["original_name"],
-                            "status": "error",
-                            "message": "API更新失敗"
-                        })
-                        print(f"❌ 更新失敗: {r['original_name']}")
-
-                except Exception as e:
-                    update_results.append({
-                        "id": r["id"],
-                        "name": r["original_name"],
-                        "status": "error",
-                        "message": str(e)
-                    })
-                    print(f"❌ エラー: {r['original_name']} - {e}")
+                        lines.append(f"❌ エラー: {result['name']} - {result['message']}")
+                    if i % PRINT_BATCH_SIZE == 0:
+                        _flush_lines(lines)
+
+        _flush_lines(lines)
 
         # サマリー出力
-        success_count = sum(1 for r in update_results if r["status"] == "success")
-        skip_count = sum(1 for r in update_results if r["status"] == "skipped")
-        error_count = sum(1 for r in update_results if r["status"] == "error")
+        status_counts = Counter(r["status"] for r in update_results)
 
         print(f"\n📊 結果サマリー")
-        print(f"   ✅ 成功: {success_count}件")
-        print(f"   ⏭️  スキップ: {skip_count}件")
-        print(f"   ❌ エラー: {error_count}件")
+        print(f"   ✅ 成功: {status_counts['success']}件")
+        print(f"   ⏭️  スキップ: {status_counts['skipped']}件")
+        print(f"   ❌ エラー: {status_counts['error']}件")
 
         return update_results
 
@@ -289,10 +415,11 @@ class FreeePartnerImporter:
         Returns:
             出力ファイルパス
         """
-        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
-            writer = csv.DictWriter(f, fieldnames=["id", "name", "status", "message"])
-            writer.writeheader()
-            writer.writerows(results)
+        with open(output_path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
+            fieldnames = ("id", "name", "status", "message")
+            writer = csv.writer(f)
+            writer.writerow(fieldnames)
+            writer.writerows(map(operator.itemgetter(*fieldnames), results))
 
         print(f"\n📄 レポート出力: {output_path}")
         return output_path
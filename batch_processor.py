@@ -8,12 +8,18 @@ freee取引先の法人情報を一括で補完する。
 import csv
 import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
 
 from batch_export import FreeePartnerExporter
 from batch_import import FreeePartnerImporter, ImportConfig
-from parent_company_finder import ParentCompanyFinder
+from constants import CSV_BUFFER_SIZE
+from parent_company_finder import ParentCompanyFinder, ParentCompanyResult
+
+
+# Claude APIへの同時リクエスト数
+CLAUDE_MAX_WORKERS = 5
 
 
 def print_header(title: str) -> None:
@@ -91,14 +97,14 @@ def auto_workflow(company_id: int, limit: int = 10) -> None:
     # Step 1: freeeから取引先を取得
     print("\n📤 Step 1: freeeから取引先を取得")
     exporter = FreeePartnerExporter()
-    partners = exporter.get_partners(company_id)
 
-    # 法人番号がない取引先のみ
-    partners_to_process = [p for p in partners if not p["corporate_number"]]
+    # 法人番号がない取引先のみ（limit件に達したら以降のページは取得しない）
+    partners_to_process = list(
+        exporter.iter_partners_missing_corp(company_id, limit=limit if limit > 0 else None)
+    )
     print(f"   対象: {len(partners_to_process)}件（法人番号未設定）")
 
     if limit > 0:
-        partners_to_process = partners_to_process[:limit]
         print(f"   処理制限: {limit}件")
 
     if not partners_to_process:
@@ -109,11 +115,24 @@ def auto_workflow(company_id: int, limit: int = 10) -> None:
     print("\n🔍 Step 2: Claude APIで法人情報を調査")
     finder = ParentCompanyFinder()
 
+    # 同じ名前の取引先は1回だけ問い合わせる（前後の空白は無視）
+    names: dict[str, str] = {}
+    for partner in partners_to_process:
+        names.setdefault(partner["name"].strip(), partner["name"])
+
+    # 問い合わせは並列に実行し、結果は取引先の順に表示する
+    with ThreadPoolExecutor(max_workers=CLAUDE_MAX_WORKERS) as executor:
+        found: dict[str, ParentCompanyResult] = dict(zip(
+            names,
+            executor.map(finder.find_parent_company, names.values()),
+            strict=True
+        ))
+
     results = []
     for i, partner in enumerate(partners_to_process, 1):
         print(f"   [{i}/{len(partners_to_process)}] {partner['name']}")
 
-        result = finder.find_parent_company(partner["name"])
+        result = found[partner["name"].strip()]
         results.append({
             "id": partner["id"],
             "original_name": partner["name"],
@@ -144,22 +163,25 @@ def auto_workflow(company_id: int, limit: int = 10) -> None:
     timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
     output_path = f"auto_result_{timestamp}.csv"
 
-    with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
-        writer = csv.DictWriter(f, fieldnames=[
+    with open(output_path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
+        writer = csv.writer(f)
+        writer.writerow([
             "id", "取引先名", "正式法人名", "法人番号",
             "インボイス登録番号", "確信度", "備考"
         ])
-        writer.writeheader()
-        for r in results:
-            writer.writerow({
-                "id": r["id"],
-                "取引先名": r["original_name"],
-                "正式法人名": r["official_name"] or "",
-                "法人番号": "",  # gBizINFOで別途取得が必要
-                "インボイス登録番号": "",
-                "確信度": r["confidence"],
-                "備考": f"{'個人事業主の可能性' if r['is_individual'] else ''}{r['notes']}"
-            })
+        # 法人番号・インボイス登録番号は gBizINFO で別途取得が必要なため空欄
+        writer.writerows(
+            (
+                r["id"],
+                r["original_name"],
+                r["official_name"] or "",
+                "",
+                "",
+                r["confidence"],
+                f"{'個人事業主の可能性' if r['is_individual'] else ''}{r['notes']}"
+            )
+            for r in results
+        )
 
     print(f"\n📄 結果出力: {output_path}")
     print("\n⚠️  注意: 法人番号は gBizINFO API で別途取得が必要です")
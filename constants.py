@@ -0,0 +1,11 @@
+"""
+共通定数モジュール
+
+複数のスクリプトで共有する入出力関連の定数を定義する。
+"""
+
+# CSV読み書き時のバッファサイズ（1MiB）
+CSV_BUFFER_SIZE = 1024 * 1024
+
+# 進捗表示をまとめて書き出す件数
+PRINT_BATCH_SIZE = 50
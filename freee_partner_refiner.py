@@ -1,8 +1,61 @@
-import requests
 import re
 import json
+import logging
 import os
-from typing import TypedDict, NotRequired
+import hashlib
+import time
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from itertools import chain
+from pathlib import Path
+from typing import TYPE_CHECKING, TypedDict, NotRequired
+
+from logger import get_logger
+
+if TYPE_CHECKING:
+    import requests
+
+
+# 取引先ごとの進捗は INFO で出す（既定では WARNING 以上のみ表示）
+logger = get_logger(__name__, level=logging.WARNING)
+
+
+# 法人格の表記、および記号・スペース・数字（1回の走査でまとめて除去する）
+# ※ 全角数字・Unicode空白まで含めた str.translate への置き換えは、
+#    法人格除去の走査が別途必要になり、計測上こちらの方が速い
+_RE_STRIP = re.compile(r'\(株\)|株式会社|（株）|有限会社|\(有\)|（有）|[　\s\-\d]+')
+
+# 店舗・支店を表すキーワード（先に並んでいるものを優先して分割する）
+_STORE_KEYWORDS: tuple[str, ...] = ('店', '支店', '営業所', 'センター', 'パーキング', '駐車場', 'ショップ', 'マート', 'ストア')
+
+# gBizINFO へ同時に投げる検索リクエスト数
+GBIZ_MAX_WORKERS = 8
+# gBizINFO 検索結果のキャッシュの有効期間（秒）。これより古い結果は検索し直す
+GBIZ_CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# freee 取引先一覧の1ページあたりの取得件数と、同時に取得するページ数
+PARTNER_PAGE_LIMIT = 100
+PARTNER_MAX_WORKERS = 8
+
+
+@lru_cache(maxsize=4096)
+def _clean_company_name(name: str) -> str:
+    """clean_company_name の本体（純粋関数なので結果をメモ化する）"""
+    # 法人格の正規化と、記号やスペースの除去を先に行う
+    name = _RE_STRIP.sub('', name)
+
+    # 1. 明確な店舗・支店キーワードで分割
+    for kw in _STORE_KEYWORDS:
+        if kw in name:
+            name = name.split(kw)[0]
+            break
+
+    # 2. 地名などの固有名詞が末尾に残っている場合の簡易的な除去（オプション）
+    # ここでは「熊本」「岡山」などの地名が残る可能性があるが、
+    # 法人検索API側で「トイザラス熊本」でも「トイザラス」がヒットすることを期待するか、
+    # あるいはさらに削るロジックを入れる。
+
+    return name.strip()
 
 
 class HojinInfo(TypedDict):
@@ -23,7 +76,12 @@ class RefineResult(TypedDict):
 
 
 class FreeePartnerRefiner:
-    def __init__(self, freee_access_token: str, gbiz_api_token: str | None = None) -> None:
+    def __init__(
+        self,
+        freee_access_token: str,
+        gbiz_api_token: str | None = None,
+        gbiz_cache_dir: str | None = None
+    ) -> None:
         self.freee_base_url: str = "https://api.freee.co.jp/api/1"
         self.freee_headers: dict[str, str] = {
             "Authorization": f"Bearer {freee_access_token}",
@@ -32,60 +90,117 @@ class FreeePartnerRefiner:
         self.gbiz_api_token: str | None = gbiz_api_token
         self.gbiz_base_url: str = "https://info.gbiz.go.jp/api/v1/hojin"
 
+        # gBizINFO 検索結果のキャッシュディレクトリ（実行をまたいで再利用する）
+        # ディレクトリは最初にキャッシュを保存するときに作る
+        if gbiz_cache_dir:
+            self.gbiz_cache_dir: Path = Path(gbiz_cache_dir)
+        else:
+            self.gbiz_cache_dir = Path(__file__).parent / ".cache" / "gbiz"
+
+    @cached_property
+    def _session(self) -> "requests.Session":
+        """
+        freee / gBizINFO 共通のHTTPセッション（初回の通信時に生成する）。
+        名前の整形だけを使う場合に requests を読み込まずに済むよう、import も遅延させる。
+        """
+        import requests
+        from requests.adapters import HTTPAdapter
+
+        # それぞれへの接続を使い回す
+        # （ヘッダーは宛先ごとに異なるため、リクエスト単位で指定する）
+        session = requests.Session()
+        for prefix in ("https://api.freee.co.jp", "https://info.gbiz.go.jp"):
+            session.mount(prefix, HTTPAdapter(pool_connections=1, pool_maxsize=32))
+        return session
+
     def clean_company_name(self, name: str) -> str:
         """
         取引先名から不要な情報を除去し、検索用の名称を生成する。
         例: 「トイザラス熊本店」 -> 「トイザラス」
         """
-        # 法人格の正規化
-        name = re.sub(r'\(株\)|株式会社|（株）|有限会社|\(有\)|（有）', '', name)
-        # 記号やスペースの除去を先に行う
-        name = re.sub(r'[　\s\-\d]+', '', name)
+        return _clean_company_name(name)
 
-        # 1. 明確な店舗・支店キーワードで分割
-        keywords: list[str] = ['店', '支店', '営業所', 'センター', 'パーキング', '駐車場', 'ショップ', 'マート', 'ストア']
-        for kw in keywords:
-            if kw in name:
-                name = name.split(kw)[0]
-                break
-
-        # 2. 地名などの固有名詞が末尾に残っている場合の簡易的な除去（オプション）
-        # ここでは「熊本」「岡山」などの地名が残る可能性があるが、
-        # 法人検索API側で「トイザラス熊本」でも「トイザラス」がヒットすることを期待するか、
-        # あるいはさらに削るロジックを入れる。
-
-        return name.strip()
+    def _gbiz_cache_file(self, keyword: str) -> Path:
+        """検索キーワードに対応するキャッシュファイルのパス"""
+        return self.gbiz_cache_dir / f"{hashlib.blake2b(keyword.encode(), digest_size=16).hexdigest()}.json"
 
     def search_gbiz_info(self, keyword: str) -> list[HojinInfo] | None:
         """
         gBizINFO APIを使用して法人情報を検索する。
+        1件以上見つかった検索結果はキーワード単位で GBIZ_CACHE_TTL_SECONDS の間キャッシュする
+        （該当なしの結果は一時的な取りこぼしの可能性があるため保存しない）。
         """
         if not self.gbiz_api_token:
             return None
 
+        cache_file = self._gbiz_cache_file(keyword)
+        try:
+            if time.time() - cache_file.stat().st_mtime < GBIZ_CACHE_TTL_SECONDS:
+                with open(cache_file, "r", encoding="utf-8") as f:
+                    return json.load(f)
+        except (json.JSONDecodeError, OSError):
+            pass
+
         headers: dict[str, str] = {"X-Ho-Api-Key": self.gbiz_api_token}
         params: dict[str, str | int] = {"name": keyword, "limit": 5}
 
         try:
-            response = requests.get(self.gbiz_base_url, headers=headers, params=params)
+            response = self._session.get(self.gbiz_base_url, headers=headers, params=params)
             if response.status_code == 200:
                 data: dict = response.json()
-                return data.get("hojin-infos", [])
+                infos: list[HojinInfo] = data.get("hojin-infos", [])
+                if infos:
+                    try:
+                        self.gbiz_cache_dir.mkdir(parents=True, exist_ok=True)
+                        with open(cache_file, "w", encoding="utf-8") as f:
+                            json.dump(infos, f, ensure_ascii=False)
+                    except OSError as e:
+                        logger.warning("キャッシュ保存に失敗: %s", e)
+                return infos
         except Exception as e:
-            print(f"Error searching gBizINFO: {e}")
+            logger.error("Error searching gBizINFO: %s", e)
         return None
 
+    def _get_partners_page(self, company_id: int, offset: int) -> dict:
+        """
+        freeeの取引先一覧を1ページ分取得する。
+        途中のページが欠けたまま一覧を返さないよう、取得に失敗した場合は例外を送出する。
+        """
+        params: dict[str, int] = {"company_id": company_id, "offset": offset, "limit": PARTNER_PAGE_LIMIT}
+        response = self._session.get(f"{self.freee_base_url}/partners", headers=self.freee_headers, params=params)
+        if response.status_code != 200:
+            logger.error("Error fetching freee partners: %s", response.text)
+            raise Exception(f"API Error: {response.status_code} - {response.text}")
+        return response.json()
+
     def get_freee_partners(self, company_id: int) -> list[Partner]:
         """
         freeeから取引先一覧を取得する。
+        全件数が分かる場合は残りのページを並列に取得する。
+        いずれかのページの取得に失敗した場合は、一部だけの一覧は返さず例外を送出する。
         """
-        params: dict[str, int] = {"company_id": company_id}
-        response = requests.get(f"{self.freee_base_url}/partners", headers=self.freee_headers, params=params)
-        if response.status_code == 200:
-            return response.json().get("partners", [])
-        else:
-            print(f"Error fetching freee partners: {response.text}")
-            return []
+        first = self._get_partners_page(company_id, 0)
+        partners: list[Partner] = first.get("partners", [])
+        if len(partners) < PARTNER_PAGE_LIMIT:
+            return partners
+
+        total = (first.get("meta") or {}).get("total_count")
+        if isinstance(total, int):
+            with ThreadPoolExecutor(max_workers=PARTNER_MAX_WORKERS) as executor:
+                pages = executor.map(
+                    lambda offset: self._get_partners_page(company_id, offset).get("partners", []),
+                    range(PARTNER_PAGE_LIMIT, total, PARTNER_PAGE_LIMIT)
+                )
+                return list(chain(partners, chain.from_iterable(pages)))
+
+        # 全件数が不明な場合は、件数が満たないページが返るまで順に取得する
+        offset = PARTNER_PAGE_LIMIT
+        while True:
+            page: list[Partner] = self._get_partners_page(company_id, offset).get("partners", [])
+            partners.extend(page)
+            if len(page) < PARTNER_PAGE_LIMIT:
+                return partners
+            offset += PARTNER_PAGE_LIMIT
 
     def update_freee_partner(self, company_id: int, partner_id: int, update_data: dict[str, str]) -> bool:
         """
@@ -96,7 +211,7 @@ class FreeePartnerRefiner:
             "company_id": company_id,
             **update_data
         }
-        response = requests.put(url, headers=self.freee_headers, json=payload)
+        response = self._session.put(url, headers=self.freee_headers, json=payload)
         return response.status_code == 200
 
     def refine_partners(self, company_id: int) -> list[RefineResult]:
@@ -106,6 +221,7 @@ class FreeePartnerRefiner:
         partners: list[Partner] = self.get_freee_partners(company_id)
         results: list[RefineResult] = []
 
+        targets: list[tuple[Partner, str]] = []
         for partner in partners:
             original_name: str = partner['name']
             current_corp_num: str | None = partner.get('corporate_number')
@@ -118,10 +234,16 @@ class FreeePartnerRefiner:
             if not search_name:
                 continue
 
-            print(f"Searching for: {original_name} -> {search_name}")
-            candidates: list[HojinInfo] | None = self.search_gbiz_info(search_name)
+            logger.info("Searching for: %s -> %s", original_name, search_name)
+            targets.append((partner, search_name))
+
+        # gBizINFO の検索は待ち時間が支配的なので並列に実行する（結果は入力順）
+        with ThreadPoolExecutor(max_workers=GBIZ_MAX_WORKERS) as executor:
+            searched = executor.map(self.search_gbiz_info, [s for _, s in targets])
 
+        for (partner, _), candidates in zip(targets, searched, strict=True):
             if candidates:
+                original_name = partner['name']
                 # 最もマッチするものを選択（簡易的に最初の1件）
                 best_match: HojinInfo = candidates[0]
                 new_corp_num: str = best_match.get('corporate_number', '')
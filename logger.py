@@ -8,6 +8,22 @@ import logging
 import sys
 from pathlib import Path
 from datetime import datetime
+from functools import cache
+
+
+# プロジェクト共通のフォーマッター
+_FORMATTER = logging.Formatter(
+    fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
+    datefmt="%Y-%m-%d %H:%M:%S"
+)
+
+
+@cache
+def _console_handler() -> logging.Handler:
+    """全ロガーで共有するコンソールハンドラ（初回呼び出し時に1つだけ生成）"""
+    handler = logging.StreamHandler(sys.stdout)
+    handler.setFormatter(_FORMATTER)
+    return handler
 
 
 def get_logger(
@@ -36,17 +52,8 @@ def get_logger(
 
     logger.setLevel(level)
 
-    # フォーマッター
-    formatter = logging.Formatter(
-        fmt="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-        datefmt="%Y-%m-%d %H:%M:%S"
-    )
-
-    # コンソールハンドラ
-    console_handler = logging.StreamHandler(sys.stdout)
-    console_handler.setLevel(level)
-    console_handler.setFormatter(formatter)
-    logger.addHandler(console_handler)
+    # コンソールハンドラ（共有。レベルの絞り込みはロガー側で行う）
+    logger.addHandler(_console_handler())
 
     # ファイルハンドラ（オプション）
     if log_dir or log_file:
@@ -66,7 +73,7 @@ def get_logger(
             encoding="utf-8"
         )
         file_handler.setLevel(level)
-        file_handler.setFormatter(formatter)
+        file_handler.setFormatter(_FORMATTER)
         logger.addHandler(file_handler)
 
     return logger
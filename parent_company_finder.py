@@ -7,11 +7,154 @@
 """
 
 import json
+import logging
 import os
+import re
 import hashlib
+import sqlite3
+import threading
+import time
+import unicodedata
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 from typing import TypedDict
-from anthropic import Anthropic
+
+from logger import get_logger
+
+try:
+    import orjson
+
+    def _dump_cache(result: dict) -> bytes:
+        return orjson.dumps(result)
+
+    _json_loads = orjson.loads
+except ImportError:  # orjson は任意依存（未インストール時は標準ライブラリ）
+    def _dump_cache(result: dict) -> bytes:
+        return json.dumps(result, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    _json_loads = json.loads
+
+logger = get_logger(__name__, level=logging.WARNING)
+
+# 同時に実行する API 呼び出し数（初期値と上限）
+# 同時実行数は ParentCompanyFinder の _AimdLimiter だけが決め、レート制限（429）の発生状況に応じて
+# AIMD で増減させる（スレッドプールは上限の数だけスレッドを用意するだけで、数は絞らない）
+MAX_CONCURRENT_REQUESTS = 8
+MAX_CONCURRENT_REQUESTS_CEILING = 50
+
+# find_parent_companies_batch で1回の API 呼び出しにまとめる取引先名の件数（既定値）
+BATCH_PROMPT_SIZE = 20
+
+# API 呼び出しの上限（応答待ちが長引いた呼び出しやリトライで処理全体が止まらないようにする）
+API_TIMEOUT_SECONDS = 20.0
+API_MAX_RETRIES = 3
+# 1件分の回答（JSON 1オブジェクト）に必要な出力トークン数の上限
+MAX_TOKENS_PER_NAME = 512
+# 問い合わせ直しても結果が変わらない API エラーのステータスコード（認証・権限・リクエスト不正など）
+NON_RETRYABLE_STATUS_CODES = frozenset({400, 401, 403, 404, 422})
+
+# ディスクキャッシュの有効期間（秒）。これより古い結果は API に問い合わせ直す
+CACHE_TTL_SECONDS = 30 * 24 * 60 * 60
+
+# 明細によく出る主要チェーンの名称 → 運営法人名
+# 取引先名がこの名称だけ、または名称の後に空白で区切って店舗名・支店名が続く場合に限り、
+# API を呼ばずに結果を返す（確認済みではないため確信度は medium とする）。
+# 別ブランドや別会社と前方一致しやすい短い名称（ローソン、ガスト、ドトール等）は載せない
+_KNOWN_CHAINS: dict[str, str] = {
+    # コンビニエンスストア
+    "セブンイレブン": "株式会社セブン-イレブン・ジャパン",
+    "セブン-イレブン": "株式会社セブン-イレブン・ジャパン",
+    "ファミリーマート": "株式会社ファミリーマート",
+    "ファミマ": "株式会社ファミリーマート",
+    "ミニストップ": "ミニストップ株式会社",
+    "デイリーヤマザキ": "山崎製パン株式会社",
+    "セイコーマート": "株式会社セコマ",
+    # カフェ・飲食
+    "スターバックス": "スターバックス コーヒー ジャパン株式会社",
+    "タリーズ": "タリーズコーヒージャパン株式会社",
+    "コメダ珈琲": "株式会社コメダ",
+    "マクドナルド": "日本マクドナルド株式会社",
+    "モスバーガー": "株式会社モスフードサービス",
+    "ケンタッキー": "日本ケンタッキー・フライド・チキン株式会社",
+    "ミスタードーナツ": "株式会社ダスキン",
+    "吉野家": "株式会社吉野家",
+    "すき家": "株式会社すき家",
+    "丸亀製麺": "株式会社丸亀製麺",
+    "サイゼリヤ": "株式会社サイゼリヤ",
+    "ロイヤルホスト": "ロイヤルホスト株式会社",
+    # 小売
+    "トイザらス": "日本トイザらス株式会社",
+    "トイザラス": "日本トイザらス株式会社",
+    "ユニクロ": "株式会社ユニクロ",
+    "しまむら": "株式会社しまむら",
+    "ニトリ": "株式会社ニトリ",
+    "無印良品": "株式会社良品計画",
+    "ダイソー": "株式会社大創産業",
+    "ドン・キホーテ": "株式会社ドン・キホーテ",
+    "ドンキホーテ": "株式会社ドン・キホーテ",
+    "イトーヨーカドー": "株式会社イトーヨーカ堂",
+    "カインズ": "株式会社カインズ",
+    "コストコ": "コストコホールセールジャパン株式会社",
+    # 家電量販店
+    "ヨドバシカメラ": "株式会社ヨドバシカメラ",
+    "ビックカメラ": "株式会社ビックカメラ",
+    "ヤマダ電機": "株式会社ヤマダデンキ",
+    "ヤマダデンキ": "株式会社ヤマダデンキ",
+    # ドラッグストア
+    "マツモトキヨシ": "株式会社マツモトキヨシ",
+    "スギ薬局": "株式会社スギ薬局",
+    "ツルハドラッグ": "株式会社ツルハ",
+}
+
+# マークダウンのコードブロック（```json ... ``` / ``` ... ```、閉じ忘れも許容）
+_CODE_FENCE = re.compile(r"```(?:json)?(.*?)(?:```|\Z)", re.S)
+
+# 既知チェーン名との照合を1回で行うパターン（長い名称を優先し、直後は空白か末尾に限る）
+_KNOWN_CHAIN_PATTERN = re.compile(
+    "(?:" + "|".join(map(re.escape, sorted(_KNOWN_CHAINS, key=len, reverse=True))) + r")(?= |\Z)"
+)
+
+
+@lru_cache(maxsize=4096)
+def _cache_key(name: str) -> str:
+    """_get_cache_key の本体（同じ取引先名が繰り返し現れるため結果をメモ化する）"""
+    return hashlib.blake2b(name.encode(), digest_size=16).hexdigest()
+
+
+def _normalize_for_lookup(name: str) -> str:
+    """既知チェーン照合用の正規化（半角カナ・全角英数をNFKCで揃え、連続する空白を1つの半角空白にする）"""
+    return " ".join(unicodedata.normalize("NFKC", name).split())
+
+
+class _AimdLimiter:
+    """
+    API 呼び出しの同時実行数を AIMD で調整する制限器（with 文で呼び出しを囲む）
+
+    レート制限（HTTP 429）で同時実行数を半減させ、成功するたびに 1/同時実行数 ずつ増やす
+    （同時実行数ぶん成功するとおよそ1増える）。
+    """
+
+    def __init__(self, limit: int, ceiling: int) -> None:
+        self.limit: float = float(min(limit, ceiling))
+        self.ceiling = ceiling
+        self._active = 0
+        self._cond = threading.Condition()
+
+    def __enter__(self) -> None:
+        with self._cond:
+            while self._active >= int(self.limit):
+                self._cond.wait()
+            self._active += 1
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        with self._cond:
+            self._active -= 1
+            if exc is None:
+                self.limit = min(float(self.ceiling), self.limit + 1 / self.limit)
+            elif getattr(exc, "status_code", None) == 429:
+                self.limit = max(1.0, self.limit / 2)
+            self._cond.notify_all()
 
 
 class ParentCompanyResult(TypedDict):
@@ -60,11 +203,30 @@ class ParentCompanyFinder:
   "notes": "補足情報（任意）"
 }"""
 
+    # 複数の取引先名をまとめて問い合わせる場合のプロンプト（回答形式のみ配列に変える）
+    BATCH_SYSTEM_PROMPT = SYSTEM_PROMPT.split("## 回答形式")[0] + """## 回答形式
+番号付きの取引先名リストが与えられます。
+必ず以下のJSON配列形式で、すべての取引先について回答してください:
+[
+  {
+    "index": 取引先名の番号,
+    "parent_company": "法人名（特定できない場合はnull）",
+    "confidence": "high | medium | low | unknown",
+    "reasoning": "判断理由",
+    "is_individual": false,
+    "notes": "補足情報（任意）"
+  }
+]"""
+
+    # 作成済みのキャッシュディレクトリ（インスタンス生成ごとの mkdir を省く）
+    _created_cache_dirs: set[Path] = set()
+
     def __init__(
         self,
         anthropic_api_key: str | None = None,
         cache_dir: str | None = None,
-        model: str = "claude-sonnet-4-20250514"
+        model: str = "claude-sonnet-4-20250514",
+        max_concurrency: int = MAX_CONCURRENT_REQUESTS
     ) -> None:
         """
         初期化
@@ -73,12 +235,19 @@ class ParentCompanyFinder:
             anthropic_api_key: Anthropic APIキー（省略時は環境変数から取得）
             cache_dir: キャッシュディレクトリ（省略時はデフォルト）
             model: 使用するClaudeモデル
+            max_concurrency: API 呼び出しの同時実行数の初期値（429 の発生状況に応じて増減する）
         """
         api_key = anthropic_api_key or os.environ.get("ANTHROPIC_API_KEY")
         if not api_key:
             raise ValueError("ANTHROPIC_API_KEY が設定されていません")
 
-        self.client = Anthropic(api_key=api_key)
+        # anthropic の読み込みは重いため、実際に使うときまで遅らせる
+        from anthropic import Anthropic
+        self.client = Anthropic(
+            api_key=api_key,
+            timeout=API_TIMEOUT_SECONDS,
+            max_retries=API_MAX_RETRIES
+        )
         self.model = model
 
         # キャッシュディレクトリの設定
@@ -86,32 +255,152 @@ class ParentCompanyFinder:
             self.cache_dir = Path(cache_dir)
         else:
             self.cache_dir = Path(__file__).parent / ".cache" / "parent_company"
-        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        first_use = self.cache_dir not in self._created_cache_dirs
+        if first_use:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            self._created_cache_dirs.add(self.cache_dir)
+
+        # キャッシュは1つの SQLite ファイルにまとめて保存する
+        # （並列問い合わせから使うため、接続はロックで保護して共有する）
+        self._db = sqlite3.connect(
+            self.cache_dir / "cache.db",
+            isolation_level=None,
+            check_same_thread=False
+        )
+        self._db.execute("CREATE TABLE IF NOT EXISTS cache (k TEXT PRIMARY KEY, v BLOB, t REAL)")
+        self._db_lock = threading.Lock()
+        # 旧形式（取引先名ごとの JSON ファイル）のキャッシュが残っていれば取り込む
+        if first_use:
+            self._import_legacy_cache()
+        # 同一実行内で繰り返し参照される結果はメモリ上にも保持する
+        self._mem_cache: dict[str, ParentCompanyResult] = {}
+        # API 呼び出しの同時実行数の制御
+        self._limiter = _AimdLimiter(max_concurrency, MAX_CONCURRENT_REQUESTS_CEILING)
+        # このインスタンスで API 呼び出しに使ったトークン数（入力 + 出力の累計）
+        self.tokens_used = 0
+        self._usage_lock = threading.Lock()
+
+    def _import_legacy_cache(self) -> None:
+        """
+        旧形式のキャッシュ（1件1ファイルの *.json）を SQLite に取り込み、ファイルを削除する
+
+        キーはファイル名ではなく保存されている original_name から作り直す（キーの生成方法が変わったため）。
+        保存日時にはファイルの更新日時を使い、読めないファイルは取り込まずに削除する
+        """
+        legacy_files = list(self.cache_dir.glob("*.json"))
+        if not legacy_files:
+            return
+        rows: list[tuple[str, bytes, float]] = []
+        for cache_file in legacy_files:
+            try:
+                result = json.loads(cache_file.read_text(encoding="utf-8"))
+                rows.append((
+                    self._get_cache_key(result["original_name"]),
+                    _dump_cache(result),
+                    cache_file.stat().st_mtime
+                ))
+            except (json.JSONDecodeError, KeyError, TypeError, OSError):
+                continue
+        try:
+            with self._db_lock:
+                self._db.executemany("INSERT OR IGNORE INTO cache (k, v, t) VALUES (?, ?, ?)", rows)
+        except sqlite3.Error as e:
+            logger.warning("旧形式のキャッシュの取り込みに失敗: %s", e)
+            return
+        for cache_file in legacy_files:
+            cache_file.unlink(missing_ok=True)
 
     def _get_cache_key(self, name: str) -> str:
-        """キャッシュキーを生成"""
-        return hashlib.md5(name.encode()).hexdigest()
+        """キャッシュキーを生成（BLAKE2b 128bit、16進32文字）"""
+        return _cache_key(name)
 
     def _get_cached_result(self, name: str) -> ParentCompanyResult | None:
-        """キャッシュから結果を取得"""
-        cache_file = self.cache_dir / f"{self._get_cache_key(name)}.json"
-        if cache_file.exists():
-            try:
-                with open(cache_file, "r", encoding="utf-8") as f:
-                    return json.load(f)
-            except (json.JSONDecodeError, IOError):
+        """キャッシュから結果を取得（メモリ → SQLite の順に確認。期限切れの結果は使わない）"""
+        cached = self._mem_cache.get(name)
+        if cached is not None:
+            return cached
+        try:
+            with self._db_lock:
+                row = self._db.execute(
+                    "SELECT v FROM cache WHERE k = ? AND t >= ?",
+                    (self._get_cache_key(name), time.time() - CACHE_TTL_SECONDS)
+                ).fetchone()
+            if not row:
                 return None
-        return None
+            cached = self._mem_cache[name] = _json_loads(row[0])
+            return cached
+        except (json.JSONDecodeError, sqlite3.Error):
+            return None
 
     def _save_to_cache(self, name: str, result: ParentCompanyResult) -> None:
         """結果をキャッシュに保存"""
-        cache_file = self.cache_dir / f"{self._get_cache_key(name)}.json"
+        self._mem_cache[name] = result
         try:
-            with open(cache_file, "w", encoding="utf-8") as f:
-                json.dump(result, f, ensure_ascii=False, indent=2)
-        except IOError as e:
+            with self._db_lock:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO cache (k, v, t) VALUES (?, ?, ?)",
+                    (self._get_cache_key(name), _dump_cache(result), time.time())
+                )
+        except sqlite3.Error as e:
             print(f"Warning: キャッシュ保存に失敗: {e}")
 
+    @staticmethod
+    def _lookup_known_chain(transaction_name: str) -> ParentCompanyResult | None:
+        """
+        既知のチェーン名に一致すれば、その運営法人を結果として返す
+
+        取引先名がチェーン名だけか、チェーン名の後に空白で区切って店舗名が続く場合のみ一致とする
+        （「ローソンストア100」のように別ブランドが前方一致するのを防ぐ）
+        """
+        match = _KNOWN_CHAIN_PATTERN.match(_normalize_for_lookup(transaction_name))
+        if not match:
+            return None
+        chain = match.group()
+        return {
+            "original_name": transaction_name,
+            "parent_company": _KNOWN_CHAINS[chain],
+            "confidence": "medium",
+            "reasoning": f"既知のチェーン名「{chain}」に一致（API での確認なし）",
+            "is_individual": False,
+            "notes": ""
+        }
+
+    def _get_local_result(self, name: str) -> ParentCompanyResult | None:
+        """API を呼ばずに得られる結果（既知チェーン → キャッシュの順に確認）"""
+        return self._lookup_known_chain(name) or self._get_cached_result(name)
+
+    def _record_usage(self, message) -> None:
+        """API の応答に含まれるトークン使用量を tokens_used に加算する"""
+        usage = getattr(message, "usage", None)
+        if usage is None:
+            return
+        tokens = (getattr(usage, "input_tokens", 0) or 0) + (getattr(usage, "output_tokens", 0) or 0)
+        with self._usage_lock:
+            self.tokens_used += tokens
+
+    @staticmethod
+    def _system_blocks(prompt: str) -> list[dict]:
+        """システムプロンプトをプロンプトキャッシュ対象のブロックとして渡す"""
+        return [{"type": "text", "text": prompt, "cache_control": {"type": "ephemeral"}}]
+
+    @staticmethod
+    def _extract_json(response_text: str) -> str:
+        """レスポンスからJSON部分を抽出（マークダウンコードブロックに囲まれている場合も対応）"""
+        fence = _CODE_FENCE.search(response_text)
+        return (fence.group(1) if fence else response_text).strip()
+
+    @staticmethod
+    def _to_result(transaction_name: str, parsed: dict) -> ParentCompanyResult:
+        """パース済みの回答を ParentCompanyResult に変換"""
+        return {
+            "original_name": transaction_name,
+            "parent_company": parsed.get("parent_company"),
+            "confidence": parsed.get("confidence", "unknown"),
+            "reasoning": parsed.get("reasoning", ""),
+            "is_individual": parsed.get("is_individual", False),
+            "notes": parsed.get("notes", "")
+        }
+
     def find_parent_company(
         self,
         transaction_name: str,
@@ -122,51 +411,39 @@ class ParentCompanyFinder:
 
         Args:
             transaction_name: 明細に記載された取引先名
-            use_cache: キャッシュを使用するかどうか
+            use_cache: キャッシュ（既知チェーン表を含む）を使用するかどうか
+                       False の場合は常に API に問い合わせる
 
         Returns:
             ParentCompanyResult: 親会社特定の結果
         """
-        # キャッシュチェック
+        # 既知チェーン・キャッシュのチェック
         if use_cache:
-            cached = self._get_cached_result(transaction_name)
+            cached = self._get_local_result(transaction_name)
             if cached:
                 return cached
 
         # Claude APIで親会社を特定
         try:
-            message = self.client.messages.create(
-                model=self.model,
-                max_tokens=1024,
-                system=self.SYSTEM_PROMPT,
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"取引先名: {transaction_name}"
-                    }
-                ]
-            )
+            with self._limiter:
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=MAX_TOKENS_PER_NAME,
+                    system=self._system_blocks(self.SYSTEM_PROMPT),
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": f"取引先名: {transaction_name}"
+                        }
+                    ]
+                )
+            self._record_usage(message)
 
             # レスポンスをパース
             response_text = message.content[0].text
-            # JSON部分を抽出（マークダウンコードブロックに囲まれている場合も対応）
-            if "```json" in response_text:
-                json_str = response_text.split("```json")[1].split("```")[0].strip()
-            elif "```" in response_text:
-                json_str = response_text.split("```")[1].split("```")[0].strip()
-            else:
-                json_str = response_text.strip()
-
-            parsed = json.loads(json_str)
+            parsed = _json_loads(self._extract_json(response_text))
 
-            result: ParentCompanyResult = {
-                "original_name": transaction_name,
-                "parent_company": parsed.get("parent_company"),
-                "confidence": parsed.get("confidence", "unknown"),
-                "reasoning": parsed.get("reasoning", ""),
-                "is_individual": parsed.get("is_individual", False),
-                "notes": parsed.get("notes", "")
-            }
+            result = self._to_result(transaction_name, parsed)
 
             # キャッシュに保存
             if use_cache:
@@ -193,10 +470,60 @@ class ParentCompanyFinder:
                 "notes": ""
             }
 
+    def _query_batch(self, transaction_names: list[str]) -> dict[str, ParentCompanyResult]:
+        """
+        複数の取引先名を1回のAPI呼び出しで問い合わせる
+
+        Args:
+            transaction_names: 取引先名のリスト（重複なし）
+
+        Returns:
+            dict[str, ParentCompanyResult]: 回答から取り出せた取引先名ごとの結果
+            （API エラーや回答の途切れで解析できなかった場合は空。
+            find_parent_companies_batch が含まれなかった名前を1件ずつ問い合わせ直す）
+
+        Raises:
+            Exception: 問い合わせ直しても結果が変わらない API エラー（NON_RETRYABLE_STATUS_CODES）
+        """
+        listing = "\n".join(f"{i}. {name}" for i, name in enumerate(transaction_names, 1))
+        try:
+            with self._limiter:
+                message = self.client.messages.create(
+                    model=self.model,
+                    max_tokens=MAX_TOKENS_PER_NAME * len(transaction_names),
+                    system=self._system_blocks(self.BATCH_SYSTEM_PROMPT),
+                    messages=[
+                        {
+                            "role": "user",
+                            "content": f"取引先名リスト:\n{listing}"
+                        }
+                    ]
+                )
+            self._record_usage(message)
+            parsed = _json_loads(self._extract_json(message.content[0].text))
+        except Exception as e:
+            logger.warning("一括問い合わせに失敗（%d件）: %s", len(transaction_names), e)
+            if getattr(e, "status_code", None) in NON_RETRYABLE_STATUS_CODES:
+                raise
+            return {}
+
+        results: dict[str, ParentCompanyResult] = {}
+        if not isinstance(parsed, list):
+            return results
+        for item in parsed:
+            if not isinstance(item, dict):
+                continue
+            index = item.get("index")
+            if isinstance(index, int) and 1 <= index <= len(transaction_names):
+                name = transaction_names[index - 1]
+                results[name] = self._to_result(name, item)
+        return results
+
     def find_parent_companies_batch(
         self,
         transaction_names: list[str],
-        use_cache: bool = True
+        use_cache: bool = True,
+        batch_size: int = BATCH_PROMPT_SIZE
     ) -> list[ParentCompanyResult]:
         """
         複数の取引先名から親会社を一括特定する
@@ -204,28 +531,74 @@ class ParentCompanyFinder:
         Args:
             transaction_names: 明細に記載された取引先名のリスト
             use_cache: キャッシュを使用するかどうか
+            batch_size: 1回のAPI呼び出しで問い合わせる件数（1なら1件ずつ並列に問い合わせる）
 
         Returns:
-            list[ParentCompanyResult]: 親会社特定の結果リスト
+            list[ParentCompanyResult]: 親会社特定の結果リスト（入力順。同じ名前の問い合わせは1回だけ行う）
         """
-        results: list[ParentCompanyResult] = []
-        for name in transaction_names:
-            result = self.find_parent_company(name, use_cache)
-            results.append(result)
-        return results
+        if batch_size <= 1:
+            names = list(dict.fromkeys(transaction_names))
+            if not names:
+                return []
+            # API 待ちが支配的なので並列に問い合わせる（結果は入力順）
+            # スレッドは上限まで用意し、実際の同時実行数は self._limiter が絞る
+            with ThreadPoolExecutor(max_workers=min(self._limiter.ceiling, len(names))) as executor:
+                found = dict(zip(
+                    names,
+                    executor.map(lambda name: self.find_parent_company(name, use_cache), names),
+                    strict=True
+                ))
+            return [found[name] for name in transaction_names]
+
+        # 既知チェーン・キャッシュ済みのものを除き、未解決の名前だけをまとめて問い合わせる
+        resolved: dict[str, ParentCompanyResult] = {}
+        pending: list[str] = []
+        for name in dict.fromkeys(transaction_names):
+            cached = self._get_local_result(name) if use_cache else None
+            if cached:
+                resolved[name] = cached
+            else:
+                pending.append(name)
+
+        chunks = [pending[start:start + batch_size] for start in range(0, len(pending), batch_size)]
+        if not chunks:
+            return [resolved[name] for name in transaction_names]
+
+        # 一括の問い合わせも並列に行う（同時実行数は self._limiter が絞る）
+        with ThreadPoolExecutor(max_workers=min(self._limiter.ceiling, len(chunks))) as executor:
+            answers = list(executor.map(self._query_batch, chunks))
+
+        unanswered: list[str] = []
+        for chunk, answered in zip(chunks, answers, strict=True):
+            for name in chunk:
+                if name in answered:
+                    resolved[name] = answered[name]
+                    if use_cache:
+                        self._save_to_cache(name, answered[name])
+                else:
+                    unanswered.append(name)
+
+        # 一括の回答から取り出せなかったものは、全チャンク分をまとめて1件ずつ並列に問い合わせる
+        if unanswered:
+            retried = self.find_parent_companies_batch(unanswered, use_cache, batch_size=1)
+            resolved.update(zip(unanswered, retried, strict=True))
+
+        return [resolved[name] for name in transaction_names]
 
     def clear_cache(self) -> int:
         """
-        キャッシュをクリアする
+        キャッシュをクリアする（取り込めずに残った旧形式のキャッシュファイルも削除する）
 
         Returns:
-            int: 削除されたキャッシュファイル数
+            int: 削除されたキャッシュ件数
         """
+        self._mem_cache.clear()
         count = 0
         for cache_file in self.cache_dir.glob("*.json"):
-            cache_file.unlink()
+            cache_file.unlink(missing_ok=True)
             count += 1
-        return count
+        with self._db_lock:
+            return count + self._db.execute("DELETE FROM cache").rowcount
 
 
 # テスト用
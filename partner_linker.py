@@ -7,13 +7,23 @@
 import csv
 import os
 import requests
+from collections import Counter
+from collections.abc import Iterable
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import TypedDict
+from requests.adapters import HTTPAdapter
+from types import TracebackType
+from typing import IO, Any, Protocol, TypedDict
+from urllib3.util.retry import Retry
 
 from partner_matcher import MatchCandidate, PartnerData
 
 
+# execute_links で同時に実行する紐付け（取引先作成 API 呼び出し）数
+LINK_MAX_WORKERS = 10
+
+
 class LinkProposal(TypedDict):
     """紐付け提案"""
     transaction_name: str        # 明細の取引先名
@@ -80,6 +90,22 @@ class PartnerLinker:
             self.base_url = None
             self.headers = {}
 
+        # 接続を使い回すセッション（execute_links の同時実行数分のコネクションを保持）
+        # 取引先作成は冪等でないため、リトライは未処理が確実なレート制限（429）のみ
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        self.session.mount("https://", HTTPAdapter(
+            pool_connections=1,
+            pool_maxsize=LINK_MAX_WORKERS,
+            max_retries=Retry(
+                total=3,
+                backoff_factor=0.5,
+                status_forcelist=[429],
+                allowed_methods=frozenset({"POST"}),
+                raise_on_status=False
+            )
+        ))
+
     def create_proposal(
         self,
         transaction_name: str,
@@ -278,6 +304,32 @@ class PartnerLinker:
             "partner_id": None
         }
 
+    def execute_links(
+        self,
+        company_id: int,
+        proposals: list[LinkProposal]
+    ) -> list[LinkResult]:
+        """
+        複数の紐付けをまとめて実行
+
+        新規作成は API 待ちが支配的なため、並列に実行する。
+
+        Args:
+            company_id: 事業所ID
+            proposals: 紐付け提案のリスト
+
+        Returns:
+            実行結果のリスト（proposals と同じ順序）
+        """
+        if not proposals:
+            return []
+
+        with ThreadPoolExecutor(max_workers=min(LINK_MAX_WORKERS, len(proposals))) as executor:
+            return list(executor.map(
+                lambda proposal: self.execute_link(company_id, proposal),
+                proposals
+            ))
+
     def _create_partner(
         self,
         company_id: int,
@@ -298,11 +350,7 @@ class PartnerLinker:
             # インボイス登録番号も設定
             payload["invoice_registration_number"] = f"T{corporate_number}"
 
-        response = requests.post(
-            f"{self.base_url}/partners",
-            headers=self.headers,
-            json=payload
-        )
+        response = self.session.post(f"{self.base_url}/partners", json=payload)
 
         if response.status_code in [200, 201]:
             return response.json().get("partner")
@@ -310,112 +358,175 @@ class PartnerLinker:
             raise Exception(f"API Error: {response.status_code} - {response.text}")
 
 
+# レポートCSVのヘッダー
+PROPOSAL_REPORT_HEADER: list[str] = [
+    "取引先名（明細）",
+    "親会社名",
+    "法人番号",
+    "アクション",
+    "紐付け先",
+    "スコア",
+    "確信度",
+    "理由"
+]
+RESULT_REPORT_HEADER: list[str] = [
+    "取引先名",
+    "アクション",
+    "ステータス",
+    "メッセージ",
+    "パートナーID"
+]
+
+
+class _RowWriter(Protocol):
+    """csv.writer が返す writer のうち、レポートの逐次書き出しで使う部分"""
+
+    def writerow(self, row: Iterable[Any], /) -> Any: ...
+
+
+def _proposal_row(p: LinkProposal) -> list[str]:
+    """提案レポートの1行"""
+    target_name = p["target_partner"]["name"] if p["target_partner"] else ""
+    return [
+        p["transaction_name"],
+        p["parent_company"] or "",
+        p["corporate_number"] or "",
+        p["action"],
+        target_name,
+        f"{p['match_score']:.2f}",
+        p["confidence"],
+        p["reason"]
+    ]
+
+
+def _result_row(r: LinkResult) -> list[str | int]:
+    """結果レポートの1行"""
+    return [
+        r["transaction_name"],
+        r["action"],
+        r["status"],
+        r["message"],
+        r["partner_id"] or ""
+    ]
+
+
 class LinkReportGenerator:
-    """紐付けレポート生成"""
+    """
+    紐付けレポート生成
 
-    def __init__(self) -> None:
+    出力先を指定して with 文で使うと、追加した提案・結果をその場でCSVに書き出し、
+    メモリには保持しない（大量件数の処理向け）。
+    出力先を指定しない場合は従来どおり保持し、generate_*_report で書き出す。
+    """
+
+    def __init__(self, proposal_path: str | None = None, result_path: str | None = None) -> None:
         self.proposals: list[LinkProposal] = []
         self.results: list[LinkResult] = []
+        self.proposal_path: str | None = proposal_path
+        self.result_path: str | None = result_path
+        self._files: list[IO[str]] = []
+        self._proposal_writer: _RowWriter | None = None
+        self._result_writer: _RowWriter | None = None
+
+        # サマリー用の集計（逐次書き出し時も保持するのはこの件数のみ）
+        self.action_counts: Counter[str] = Counter()
+        self.confidence_counts: Counter[str] = Counter()
+        self.status_counts: Counter[str] = Counter()
+
+    def _open_stream(self, path: str, header: list[str]) -> _RowWriter:
+        """出力ファイルを開いてヘッダーを書き込み、writer を返す"""
+        f = open(path, "w", encoding="utf-8-sig", newline="")
+        self._files.append(f)
+        writer = csv.writer(f)
+        writer.writerow(header)
+        return writer
+
+    def __enter__(self) -> "LinkReportGenerator":
+        if self.proposal_path:
+            self._proposal_writer = self._open_stream(self.proposal_path, PROPOSAL_REPORT_HEADER)
+        if self.result_path:
+            self._result_writer = self._open_stream(self.result_path, RESULT_REPORT_HEADER)
+        return self
+
+    def __exit__(
+        self,
+        exc_type: type[BaseException] | None,
+        exc: BaseException | None,
+        tb: TracebackType | None
+    ) -> None:
+        for f in self._files:
+            f.close()
+        self._files.clear()
+        self._proposal_writer = None
+        self._result_writer = None
 
     def add_proposal(self, proposal: LinkProposal) -> None:
         """提案を追加"""
-        self.proposals.append(proposal)
+        self.action_counts[proposal["action"]] += 1
+        self.confidence_counts[proposal["confidence"]] += 1
+        if self._proposal_writer:
+            self._proposal_writer.writerow(_proposal_row(proposal))
+        else:
+            self.proposals.append(proposal)
 
     def add_result(self, result: LinkResult) -> None:
         """結果を追加"""
-        self.results.append(result)
+        self.status_counts[result["status"]] += 1
+        if self._result_writer:
+            self._result_writer.writerow(_result_row(result))
+        else:
+            self.results.append(result)
 
     def generate_proposal_report(self, output_path: str | None = None) -> str:
-        """提案レポートを生成"""
+        """提案レポートを生成（逐次書き出し中ならその出力先を返す）"""
+        if self._proposal_writer and not output_path:
+            return self.proposal_path
         if not output_path:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"link_proposals_{timestamp}.csv"
 
         with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "取引先名（明細）",
-                "親会社名",
-                "法人番号",
-                "アクション",
-                "紐付け先",
-                "スコア",
-                "確信度",
-                "理由"
-            ])
-
-            for p in self.proposals:
-                target_name = p["target_partner"]["name"] if p["target_partner"] else ""
-                writer.writerow([
-                    p["transaction_name"],
-                    p["parent_company"] or "",
-                    p["corporate_number"] or "",
-                    p["action"],
-                    target_name,
-                    f"{p['match_score']:.2f}",
-                    p["confidence"],
-                    p["reason"]
-                ])
+            writer.writerow(PROPOSAL_REPORT_HEADER)
+            writer.writerows(map(_proposal_row, self.proposals))
 
         return output_path
 
     def generate_result_report(self, output_path: str | None = None) -> str:
-        """結果レポートを生成"""
+        """結果レポートを生成（逐次書き出し中ならその出力先を返す）"""
+        if self._result_writer and not output_path:
+            return self.result_path
         if not output_path:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"link_results_{timestamp}.csv"
 
         with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
             writer = csv.writer(f)
-            writer.writerow([
-                "取引先名",
-                "アクション",
-                "ステータス",
-                "メッセージ",
-                "パートナーID"
-            ])
-
-            for r in self.results:
-                writer.writerow([
-                    r["transaction_name"],
-                    r["action"],
-                    r["status"],
-                    r["message"],
-                    r["partner_id"] or ""
-                ])
+            writer.writerow(RESULT_REPORT_HEADER)
+            writer.writerows(map(_result_row, self.results))
 
         return output_path
 
     def print_summary(self) -> None:
         """サマリーを表示"""
         # 提案サマリー
-        if self.proposals:
-            actions = {}
-            confidences = {}
-            for p in self.proposals:
-                actions[p["action"]] = actions.get(p["action"], 0) + 1
-                confidences[p["confidence"]] = confidences.get(p["confidence"], 0) + 1
-
+        if self.action_counts:
             print("\n📊 提案サマリー")
-            print(f"   合計: {len(self.proposals)}件")
+            print(f"   合計: {self.action_counts.total()}件")
             print(f"   アクション別:")
-            for action, count in actions.items():
+            for action, count in self.action_counts.items():
                 icon = {"link": "🔗", "create": "➕", "skip": "⏭️"}.get(action, "❓")
                 print(f"      {icon} {action}: {count}件")
             print(f"   確信度別:")
-            for conf, count in confidences.items():
+            for conf, count in self.confidence_counts.items():
                 icon = {"high": "🟢", "medium": "🟡", "low": "🔴", "unknown": "⚪"}.get(conf, "❓")
                 print(f"      {icon} {conf}: {count}件")
 
         # 結果サマリー
-        if self.results:
-            statuses = {}
-            for r in self.results:
-                statuses[r["status"]] = statuses.get(r["status"], 0) + 1
-
+        if self.status_counts:
             print("\n📊 実行結果サマリー")
-            print(f"   合計: {len(self.results)}件")
-            for status, count in statuses.items():
+            print(f"   合計: {self.status_counts.total()}件")
+            for status, count in self.status_counts.items():
                 icon = {"success": "✅", "failed": "❌", "skipped": "⏭️"}.get(status, "❓")
                 print(f"      {icon} {status}: {count}件")
 
@@ -4,10 +4,64 @@
 freee既存取引先と親会社名をマッチングし、紐付け候補を提案する。
 """
 
+import heapq
+import os
 import re
-from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import astuple, dataclass
 from typing import TypedDict
 
+try:
+    from rapidfuzz.distance import JaroWinkler as _RapidJaroWinkler
+    from rapidfuzz.distance import Levenshtein as _RapidLevenshtein
+except ImportError:  # rapidfuzz は任意依存（未インストール時は純Python実装を使う）
+    _RapidJaroWinkler = None
+    _RapidLevenshtein = None
+
+try:
+    import numpy  # noqa: F401  rapidfuzz.process.cdist が必要とする
+    from rapidfuzz.process import cdist as _rapid_cdist
+except ImportError:
+    _rapid_cdist = None
+
+
+# 類似度を比較するフィールド（同点の場合は先に並んでいるものを優先）
+MATCH_FIELDS: tuple[str, ...] = ("name", "long_name", "shortcut1", "shortcut2")
+
+# match_by_name の結果を保持する件数（同じ取引先名の繰り返し検索を省く）
+MATCH_CACHE_SIZE = 4096
+
+# match_many で一度に計算する距離行列の要素数の上限（クエリ数 × フィールド数）
+MATCH_MANY_MATRIX_CELLS = 1 << 22
+
+# 正規化用: 全角英数 → 半角、空白・記号は削除（1回の str.translate でまとめて行う）
+# 空白は正規表現の \s と同じ範囲（Unicode の空白文字はすべて U+3000 以下にある）
+_NORMALIZE_TABLE = str.maketrans(
+    'ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ０１２３４５６７８９',
+    'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789',
+    '-・．.。、,（）()「」【】[]' + ''.join(filter(str.isspace, map(chr, range(0x3001))))
+)
+# _NORMALIZE_TABLE で削除される ASCII 文字（ASCII のみの名前の高速判定用）
+_ASCII_STRIP_CHARS = frozenset(
+    c for c in map(chr, range(128)) if _NORMALIZE_TABLE.get(ord(c), c) is None
+)
+# 正規化用: 法人格
+_HOUJIN_RE = re.compile(r'(株式会社|有限会社|合同会社|合資会社|株|有|㈱|㈲)')
+
+
+def _rapid_jaro_winkler(s1_norm: str, s2_norm: str) -> float:
+    """rapidfuzz の Jaro-Winkler（空文字の扱いは内蔵実装に合わせる）"""
+    if not s1_norm or not s2_norm:
+        return 0.0
+    return _RapidJaroWinkler.similarity(s1_norm, s2_norm)
+
+
+def _bigrams(text: str) -> frozenset[str]:
+    """文字 2-gram の集合（1文字の場合はその文字自体）"""
+    if len(text) < 2:
+        return frozenset((text,)) if text else frozenset()
+    return frozenset(text[i:i + 2] for i in range(len(text) - 1))
+
 
 class PartnerData(TypedDict):
     """freee取引先データ"""
@@ -34,6 +88,8 @@ class MatchConfig:
     max_candidates: int = 5          # 最大候補数
     exact_match_boost: float = 0.3   # 完全一致ボーナス
     corp_num_weight: float = 1.0     # 法人番号一致の重み
+    prefilter_factor: int = 0        # 2-gram の Jaccard 係数で上位 max_candidates × この倍数件に絞ってから精密に採点（0: 絞らない）
+    fast_jaro_winkler: bool = False  # rapidfuzz の Jaro-Winkler を使う（高速だがスコアが内蔵実装と一部異なる）
 
 
 class PartnerMatcher:
@@ -65,15 +121,50 @@ class PartnerMatcher:
         # 法人番号 → パートナー
         self.corp_num_index: dict[str, PartnerData] = {}
 
-        for partner in self.partners:
-            # 名前のインデックス
-            for field in ["name", "shortcut1", "shortcut2", "long_name"]:
+        # 類似度計算用: 全パートナーの比較対象フィールドを正規化して平坦に並べる
+        # （パートナー i のフィールドは _field_strings[start:end]、(start, end) = _field_ranges[i]）
+        # 各フィールドの正規化はここで1回だけ行い、検索時には再計算しない
+        # （類似度の走査はこれらの配列だけで行い、パートナーの辞書は候補として返すときだけ参照する）
+        self._field_strings: list[str] = []
+        self._field_names: list[str] = []
+        self._field_ranges: list[tuple[int, int]] = []
+        # フィールドの位置 → そのフィールドを持つパートナーの位置
+        self._field_owners: list[int] = []
+        # 2-gram → その 2-gram を含むフィールドの位置と、各フィールドの 2-gram の数
+        # （prefilter_factor 指定時の粗い絞り込みで、共通の 2-gram を持つフィールドだけを数える）
+        self._bigram_index: dict[str, list[int]] = {}
+        self._field_bigram_counts: list[int] = []
+        # 文字 → その文字をいずれかのフィールドに含むパートナーの位置
+        # （共通の文字が1つもない組み合わせは類似度0になるため、検索対象から外せる）
+        self._char_index: dict[str, set[int]] = {}
+        # パートナー（オブジェクトID）→ self.partners 内の位置
+        self._positions: dict[int, int] = {}
+        # self.partners と同じ並びの取引先ID（類似度検索の走査で辞書を引かずに済むようにする）
+        self._ids: list[int] = []
+        # (名前, 法人番号, 設定) → match_by_name の結果
+        self._match_cache: dict[tuple, tuple[MatchCandidate, ...]] = {}
+
+        for i, partner in enumerate(self.partners):
+            self._positions.setdefault(id(partner), i)
+            self._ids.append(partner["id"])
+            start = len(self._field_strings)
+            for field in MATCH_FIELDS:
                 value = partner.get(field)
                 if value:
                     normalized = self._normalize(value)
-                    if normalized not in self.name_index:
-                        self.name_index[normalized] = []
-                    self.name_index[normalized].append(partner)
+                    k = len(self._field_strings)
+                    self._field_strings.append(normalized)
+                    self._field_names.append(field)
+                    self._field_owners.append(i)
+                    bigrams = _bigrams(normalized)
+                    self._field_bigram_counts.append(len(bigrams))
+                    for gram in bigrams:
+                        self._bigram_index.setdefault(gram, []).append(k)
+                    # 名前のインデックス
+                    self.name_index.setdefault(normalized, []).append(partner)
+                    for ch in set(normalized):
+                        self._char_index.setdefault(ch, set()).add(i)
+            self._field_ranges.append((start, len(self._field_strings)))
 
             # 法人番号のインデックス
             corp_num = partner.get("corporate_number")
@@ -82,44 +173,62 @@ class PartnerMatcher:
 
     def _normalize(self, text: str) -> str:
         """テキストを正規化"""
-        # 全角→半角
-        text = text.translate(str.maketrans(
-            'ａｂｃｄｅｆｇｈｉｊｋｌｍｎｏｐｑｒｓｔｕｖｗｘｙｚＡＢＣＤＥＦＧＨＩＪＫＬＭＮＯＰＱＲＳＴＵＶＷＸＹＺ０１２３４５６７８９',
-            'abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789'
-        ))
+        # ASCII のみの名前は全角文字・法人格を含まない（記号がなければ小文字化だけでよい）
+        if text.isascii():
+            if _ASCII_STRIP_CHARS.isdisjoint(text):
+                return text.lower()
+            return text.translate(_NORMALIZE_TABLE).lower()
+
+        # 全角→半角、空白・記号除去
+        text = text.translate(_NORMALIZE_TABLE)
         # 小文字化
         text = text.lower()
-        # 空白・記号除去
-        text = re.sub(r'[\s\-・．.。、,（）()「」【】\[\]]+', '', text)
         # 法人格を除去
-        text = re.sub(r'(株式会社|有限会社|合同会社|合資会社|株|有|㈱|㈲)', '', text)
+        text = _HOUJIN_RE.sub('', text)
         return text
 
     def _levenshtein_distance(self, s1: str, s2: str) -> int:
         """レーベンシュタイン距離を計算"""
+        if _RapidLevenshtein is not None:
+            return _RapidLevenshtein.distance(s1, s2)
+
         if len(s1) < len(s2):
             s1, s2 = s2, s1
 
         if len(s2) == 0:
             return len(s1)
 
-        prev_row = range(len(s2) + 1)
+        # 2行分のバッファを使い回す（行ごとのリスト生成と min() のタプル生成を避ける）
+        prev_row = list(range(len(s2) + 1))
+        curr_row = list(prev_row)
         for i, c1 in enumerate(s1):
-            curr_row = [i + 1]
+            curr_row[0] = left = i + 1
             for j, c2 in enumerate(s2):
-                insertions = prev_row[j + 1] + 1
-                deletions = curr_row[j] + 1
-                substitutions = prev_row[j] + (c1 != c2)
-                curr_row.append(min(insertions, deletions, substitutions))
-            prev_row = curr_row
+                best = prev_row[j] + (c1 != c2)        # 置換
+                if prev_row[j + 1] + 1 < best:         # 挿入
+                    best = prev_row[j + 1] + 1
+                if left + 1 < best:                    # 削除
+                    best = left + 1
+                curr_row[j + 1] = left = best
+            prev_row, curr_row = curr_row, prev_row
 
         return prev_row[-1]
 
     def _similarity_score(self, s1: str, s2: str) -> float:
         """類似度スコアを計算 (0.0 - 1.0)"""
-        s1_norm = self._normalize(s1)
-        s2_norm = self._normalize(s2)
+        return self._similarity_normalized(self._normalize(s1), self._normalize(s2))
+
+    def _similarity_normalized(
+        self,
+        s1_norm: str,
+        s2_norm: str,
+        distance: int | None = None
+    ) -> float:
+        """
+        正規化済みの文字列同士の類似度スコア (0.0 - 1.0)
 
+        distance にレーベンシュタイン距離を渡した場合は再計算しない
+        """
         if not s1_norm or not s2_norm:
             return 0.0
 
@@ -134,15 +243,25 @@ class PartnerMatcher:
             return 0.7 + 0.3 * (shorter / longer)
 
         # レーベンシュタイン距離ベースの類似度
-        distance = self._levenshtein_distance(s1_norm, s2_norm)
+        if distance is None:
+            distance = self._levenshtein_distance(s1_norm, s2_norm)
         max_len = max(len(s1_norm), len(s2_norm))
         return max(0.0, 1.0 - (distance / max_len))
 
     def _jaro_winkler(self, s1: str, s2: str) -> float:
         """Jaro-Winkler類似度を計算"""
-        s1_norm = self._normalize(s1)
-        s2_norm = self._normalize(s2)
+        return self._jaro_winkler_normalized(self._normalize(s1), self._normalize(s2))
+
+    def _jaro_winkler_normalized(self, s1_norm: str, s2_norm: str) -> float:
+        """
+        正規化済みの文字列同士の Jaro-Winkler 類似度
 
+        既定ではこの実装を使う。rapidfuzz.distance.JaroWinkler は Jaro 部分の対応付けと
+        接頭辞ボーナスの適用条件がこの実装と異なり、スコアと紐付け判定が変わるため、
+        MatchConfig.fast_jaro_winkler を指定した場合だけ代わりに使う（明示的な選択）。
+        numba などでの JIT 化も、数十文字の名前ではコードポイント配列への変換が
+        計算本体と同じくらいかかるため行わず、窓内の探索を str.find に任せている
+        """
         if not s1_norm or not s2_norm:
             return 0.0
 
@@ -154,36 +273,25 @@ class PartnerMatcher:
         if match_distance < 0:
             match_distance = 0
 
-        s1_matches = [False] * len1
+        # s1 の各文字について、窓内でまだ対応していない s2 の同じ文字を str.find で探す
         s2_matches = [False] * len2
-
-        matches = 0
-        transpositions = 0
-
-        for i in range(len1):
-            start = max(0, i - match_distance)
-            end = min(i + match_distance + 1, len2)
-
-            for j in range(start, end):
-                if s2_matches[j] or s1_norm[i] != s2_norm[j]:
-                    continue
-                s1_matches[i] = True
+        s1_matched: list[str] = []
+        for i, c in enumerate(s1_norm):
+            end = i + match_distance + 1
+            j = s2_norm.find(c, i - match_distance if i > match_distance else 0, end)
+            while j != -1 and s2_matches[j]:
+                j = s2_norm.find(c, j + 1, end)
+            if j != -1:
                 s2_matches[j] = True
-                matches += 1
-                break
+                s1_matched.append(c)
 
+        matches = len(s1_matched)
         if matches == 0:
             return 0.0
 
-        k = 0
-        for i in range(len1):
-            if not s1_matches[i]:
-                continue
-            while not s2_matches[k]:
-                k += 1
-            if s1_norm[i] != s2_norm[k]:
-                transpositions += 1
-            k += 1
+        # 対応した文字を出現順に並べ、位置ごとに食い違う数を数える
+        s2_matched = [c for c, hit in zip(s2_norm, s2_matches, strict=True) if hit]
+        transpositions = sum(c1 != c2 for c1, c2 in zip(s1_matched, s2_matched, strict=True))
 
         jaro = (matches / len1 + matches / len2 + (matches - transpositions / 2) / matches) / 3
 
@@ -197,14 +305,62 @@ class PartnerMatcher:
 
         return jaro + prefix * 0.1 * (1 - jaro)
 
+    def _candidate_indices(self, name_norm: str) -> list[int] | range:
+        """
+        類似度を計算する必要のあるパートナーの位置（元の並び順）
+
+        正規化後の名前と共通の文字を持たないパートナーはスコア0になるため除外する。
+        ただし空文字同士の完全一致ボーナスや min_score <= 0 の場合は全件が対象になる。
+
+        部分文字列を含むかどうかでの絞り込み（複数パターンの一括照合など）は、
+        表記揺れで部分一致しない類似候補（例: 「ファミリマート」）を落としてしまうため行わない。
+        スコアの結果を変えずに除外できるのは、この文字単位の判定まで。
+        """
+        if not name_norm or self.config.min_score <= 0:
+            return range(len(self.partners))
+
+        hit: set[int] = set()
+        for ch in set(name_norm):
+            hit |= self._char_index.get(ch, set())
+        return sorted(hit)
+
+    def _prefilter(self, name_norm: str, indices: list[int] | range) -> list[int] | range:
+        """
+        2-gram の Jaccard 係数が高い順に上位 max_candidates × prefilter_factor 件に絞る（元の並び順）
+
+        精密な採点の前段の粗い絞り込みで、本来の上位候補を落とす可能性がある
+        """
+        limit = self.config.max_candidates * self.config.prefilter_factor
+        if len(indices) <= limit:
+            return indices
+
+        query = _bigrams(name_norm)
+
+        # 共通の 2-gram の数を、転置インデックスから共通の 2-gram を持つフィールドについてだけ数える
+        shared: dict[int, int] = {}
+        for gram in query:
+            for k in self._bigram_index.get(gram, ()):
+                shared[k] = shared.get(k, 0) + 1
+
+        # パートナーごとに、フィールドの Jaccard 係数の最大値（共通の 2-gram がなければ0）
+        jaccard: dict[int, float] = {}
+        for k, common in shared.items():
+            i = self._field_owners[k]
+            score = common / (len(query) + self._field_bigram_counts[k] - common)
+            if score > jaccard.get(i, 0.0):
+                jaccard[i] = score
+
+        return sorted(heapq.nlargest(limit, indices, key=lambda i: jaccard.get(i, 0.0)))
+
     def match_by_corporate_number(self, corporate_number: str) -> PartnerData | None:
-        """法人番号で完全一致検索"""
+        """法人番号で完全一致検索（_build_index で作成した corp_num_index を引くだけで、一覧は走査しない）"""
         return self.corp_num_index.get(corporate_number)
 
     def match_by_name(
         self,
         name: str,
-        corporate_number: str | None = None
+        corporate_number: str | None = None,
+        alternatives: bool = False
     ) -> list[MatchCandidate]:
         """
         名前で類似検索
@@ -212,10 +368,148 @@ class PartnerMatcher:
         Args:
             name: 検索する名前（親会社名）
             corporate_number: 法人番号（あれば完全一致優先）
+            alternatives: 法人番号が一致した場合も名前の類似候補を併せて返すか
+                （False の場合は法人番号の一致1件のみを返し、名前の検索を省く）
 
         Returns:
             マッチング候補リスト（スコア降順）
         """
+        # 設定は PartnerIndex.search などで差し替えられるため、キーに含める
+        key = (name, corporate_number, (astuple(self.config), alternatives))
+        cached = self._match_cache.get(key)
+        if cached is None:
+            cached = self._store_match(key, self._match_by_name(name, corporate_number, alternatives))
+        return list(cached)
+
+    def match_many(
+        self,
+        names: list[str],
+        corporate_numbers: list[str | None] | None = None,
+        alternatives: bool = False
+    ) -> list[list[MatchCandidate]]:
+        """
+        複数の名前をまとめて類似検索（結果は match_by_name を順に呼んだ場合と同じ）
+
+        rapidfuzz + numpy がある場合は、未検索の名前と全フィールドとの
+        レーベンシュタイン距離を行列として一括計算する。
+
+        Args:
+            names: 検索する名前のリスト
+            corporate_numbers: names と同じ並びの法人番号（省略時はすべてなし）
+            alternatives: match_by_name と同じ
+
+        Returns:
+            names と同じ並びのマッチング候補リスト
+        """
+        if corporate_numbers is None:
+            corporate_numbers = [None] * len(names)
+
+        config_key = (astuple(self.config), alternatives)
+        results, pending = self._split_cached(list(zip(names, corporate_numbers, strict=True)), config_key)
+
+        queries = list(pending)
+        chunk_size = max(1, MATCH_MANY_MATRIX_CELLS // max(1, len(self._field_strings)))
+        for chunk_start in range(0, len(queries), chunk_size):
+            chunk = queries[chunk_start:chunk_start + chunk_size]
+            # 検索する名前の正規化も1回だけ行い、距離行列の計算と採点の両方で使う
+            norms = [self._normalize(name) for name, _ in chunk]
+            rows: list[list[int] | None] = [None] * len(chunk)
+            if _rapid_cdist is not None and self._field_strings:
+                matrix = _rapid_cdist(
+                    norms, self._field_strings,
+                    scorer=_RapidLevenshtein.distance, workers=-1
+                )
+                rows = matrix.tolist()
+
+            for query, norm, row in zip(chunk, norms, rows, strict=True):
+                found = self._store_match(
+                    (*query, config_key), self._match_by_name(*query, alternatives, row, norm)
+                )
+                for pos in pending[query]:
+                    results[pos] = list(found)
+
+        return results
+
+    def match_many_parallel(
+        self,
+        queries: list[tuple[str, str | None]],
+        alternatives: bool = False,
+        max_workers: int | None = None
+    ) -> list[list[MatchCandidate]]:
+        """
+        複数の (名前, 法人番号) をスレッドで並列に検索（結果は match_by_name と同じ）
+
+        距離計算が GIL を解放する rapidfuzz を使う場合に効果がある。
+        純Python実装のみの環境では GIL を保持したままのため速くならない。
+
+        Args:
+            queries: (名前, 法人番号) のリスト
+            alternatives: match_by_name と同じ
+            max_workers: スレッド数（省略時はCPU数）
+
+        Returns:
+            queries と同じ並びのマッチング候補リスト
+        """
+        config_key = (astuple(self.config), alternatives)
+        results, pending = self._split_cached(queries, config_key)
+
+        # キャッシュの更新は競合を避けるため呼び出し元のスレッドでまとめて行う
+        # 並列化はこのスレッドプールで行うため、各スレッド内の cdist は1スレッドで計算する
+        # （cdist 側でもCPU数分のスレッドを立てると、スレッド数が掛け算で増えてしまう）
+        with ThreadPoolExecutor(max_workers=max_workers or os.cpu_count()) as executor:
+            found_all = executor.map(
+                lambda q: self._match_by_name(*q, alternatives, cdist_workers=1), pending
+            )
+            for query, found in zip(pending, found_all, strict=True):
+                stored = self._store_match((*query, config_key), found)
+                for pos in pending[query]:
+                    results[pos] = list(stored)
+
+        return results
+
+    def _split_cached(
+        self,
+        queries: list[tuple[str, str | None]],
+        config_key: tuple
+    ) -> tuple[list[list[MatchCandidate]], dict[tuple[str, str | None], list[int]]]:
+        """
+        キャッシュ済みの結果を埋めた結果リストと、
+        キャッシュにない (名前, 法人番号) → 結果を入れる位置 を返す
+        """
+        results: list[list[MatchCandidate]] = [[] for _ in queries]
+        pending: dict[tuple[str, str | None], list[int]] = {}
+        for pos, query in enumerate(queries):
+            cached = self._match_cache.get((*query, config_key))
+            if cached is not None:
+                results[pos] = list(cached)
+            else:
+                pending.setdefault(query, []).append(pos)
+        return results, pending
+
+    def _store_match(self, key: tuple, candidates: list[MatchCandidate]) -> tuple[MatchCandidate, ...]:
+        """検索結果をキャッシュに保存する"""
+        if len(self._match_cache) >= MATCH_CACHE_SIZE:
+            # 最も古いものから捨てる
+            del self._match_cache[next(iter(self._match_cache))]
+        stored = self._match_cache[key] = tuple(candidates)
+        return stored
+
+    def _match_by_name(
+        self,
+        name: str,
+        corporate_number: str | None,
+        alternatives: bool = False,
+        distances: list[int] | None = None,
+        name_norm: str | None = None,
+        cdist_workers: int = -1
+    ) -> list[MatchCandidate]:
+        """
+        match_by_name の本体（キャッシュなし）
+
+        distances に全フィールドとのレーベンシュタイン距離（_field_strings と同じ並び）を、
+        name_norm に正規化済みの name を渡した場合はそれを使う。
+        cdist_workers は距離を一括計算する場合の rapidfuzz のスレッド数（-1 はCPU数）
+        """
         candidates: list[MatchCandidate] = []
         seen_ids: set[int] = set()
 
@@ -229,35 +523,86 @@ class PartnerMatcher:
                     "match_type": "exact_corp_num",
                     "matched_field": "corporate_number"
                 })
+                # 法人番号の一致が最良の候補なので、他の候補が不要なら名前の検索は行わない
+                if not alternatives or self.config.max_candidates <= 1:
+                    return candidates[:self.config.max_candidates]
                 seen_ids.add(exact_match["id"])
 
-        # 2. 名前の類似度検索
-        name_norm = self._normalize(name)
+        # 2. 正規化後の名前が完全一致するもの（スコア1.0、他の候補がこれを上回ることはない）
+        if name_norm is None:
+            name_norm = self._normalize(name)
+
+        if name_norm and self.config.min_score <= 1.0:
+            for partner in self.name_index.get(name_norm, []):
+                if partner["id"] in seen_ids:
+                    continue
+                start, end = self._field_ranges[self._positions[id(partner)]]
+                matched_field = next(
+                    self._field_names[k] for k in range(start, end)
+                    if self._field_strings[k] == name_norm
+                )
+                candidates.append({
+                    "partner": partner,
+                    "score": 1.0,
+                    "match_type": "exact_name",
+                    "matched_field": matched_field
+                })
+                seen_ids.add(partner["id"])
 
-        for partner in self.partners:
-            if partner["id"] in seen_ids:
+            # 完全一致だけで候補数が埋まれば類似度検索は不要
+            if len(candidates) >= self.config.max_candidates:
+                return candidates[:self.config.max_candidates]
+
+        # 3. 名前の類似度検索
+        indices = self._candidate_indices(name_norm)
+        if self.config.prefilter_factor > 0:
+            indices = self._prefilter(name_norm, indices)
+
+        # 対象フィールドとのレーベンシュタイン距離を一括計算（rapidfuzz + numpy がある場合）
+        if distances is None and _rapid_cdist is not None:
+            field_positions = [k for i in indices for k in range(*self._field_ranges[i])]
+            if field_positions:
+                row = _rapid_cdist(
+                    [name_norm], [self._field_strings[k] for k in field_positions],
+                    scorer=_RapidLevenshtein.distance, workers=cdist_workers
+                )[0].tolist()
+                distances = dict(zip(field_positions, row, strict=True))
+
+        min_score = self.config.min_score
+        jaro_winkler = self._jaro_winkler_normalized
+        if self.config.fast_jaro_winkler and _RapidJaroWinkler is not None:
+            jaro_winkler = _rapid_jaro_winkler
+        ids = self._ids
+        field_strings = self._field_strings
+        field_ranges = self._field_ranges
+        for i in indices:
+            if ids[i] in seen_ids:
                 continue
 
+            start, end = field_ranges[i]
+
             best_score = 0.0
             best_field = ""
 
-            for field in ["name", "long_name", "shortcut1", "shortcut2"]:
-                value = partner.get(field)
-                if not value:
-                    continue
+            for k in range(start, end):
+                value_norm = field_strings[k]
 
                 # レーベンシュタインとJaro-Winklerの平均
-                lev_score = self._similarity_score(name, value)
-                jw_score = self._jaro_winkler(name, value)
+                lev_score = self._similarity_normalized(name_norm, value_norm, distances[k] if distances else None)
+                # Jaro-Winkler が最大の1.0でも平均が閾値に届かないフィールドは採用されないので計算しない
+                # （(lev + 1) / 2 < min_score を、平均の計算と同じ丸めになる形で判定する）
+                if lev_score + 1.0 < 2 * min_score:
+                    continue
+                jw_score = jaro_winkler(name_norm, value_norm)
                 score = (lev_score + jw_score) / 2
 
                 # 完全一致ボーナス
-                if self._normalize(value) == name_norm:
+                if value_norm == name_norm:
                     score = min(1.0, score + self.config.exact_match_boost)
 
                 if score > best_score:
                     best_score = score
-                    best_field = field
+                    best_field = self._field_names[k]
 
             if best_score >= self.config.min_score:
                 match_type = "exact_name" if best_score >= 0.95 else "name_similarity"
@@ -265,12 +610,12 @@ class PartnerMatcher:
                     match_type = "partial_match"
 
                 candidates.append({
-                    "partner": partner,
+                    "partner": self.partners[i],
                     "score": best_score,
                     "match_type": match_type,
                     "matched_field": best_field
                 })
-                seen_ids.add(partner["id"])
+                seen_ids.add(ids[i])
 
         # スコア降順でソート
         candidates.sort(key=lambda x: x["score"], reverse=True)
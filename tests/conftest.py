@@ -0,0 +1,13 @@
+"""
+テスト共通設定
+
+anthropic モジュールはテストセッションの開始時に1回だけモックに差し替える
+（API を呼ばず、未インストールの環境でもテストできるようにする）。
+pytest-xdist で並列実行した場合も、各ワーカーの開始時にここで1回だけ差し替わる。
+共有データはテストクラスの setUpClass で作るため、ワーカーごとに1回だけ用意される。
+"""
+
+import sys
+from unittest.mock import MagicMock
+
+sys.modules.setdefault('anthropic', MagicMock())
@@ -0,0 +1,49 @@
+"""
+テスト共通データ
+
+複数のテストモジュールで使う取引先データを定義する（コピーが食い違わないよう1か所にまとめる）。
+"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
+
+from partner_matcher import PartnerData
+
+
+# テスト用の取引先（テスト中に変更しないので、モジュールで1つだけ作って共有する）
+TEST_PARTNERS: list[PartnerData] = [
+    {
+        "id": 1,
+        "name": "株式会社セブン-イレブン・ジャパン",
+        "shortcut1": "セブンイレブン",
+        "shortcut2": None,
+        "long_name": None,
+        "corporate_number": "8011101021428"
+    },
+    {
+        "id": 2,
+        "name": "日本トイザらス株式会社",
+        "shortcut1": "トイザらス",
+        "shortcut2": None,
+        "long_name": None,
+        "corporate_number": "4010401089234"
+    },
+    {
+        "id": 3,
+        "name": "株式会社ファミリーマート",
+        "shortcut1": "ファミマ",
+        "shortcut2": "ファミリーマート",
+        "long_name": None,
+        "corporate_number": "7010001098262"
+    },
+    {
+        "id": 4,
+        "name": "スターバックス コーヒー ジャパン株式会社",
+        "shortcut1": "スタバ",
+        "shortcut2": None,
+        "long_name": "スターバックスコーヒージャパン",
+        "corporate_number": "9010401039817"
+    }
+]
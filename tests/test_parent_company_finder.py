@@ -3,24 +3,79 @@ parent_company_finder.py のユニットテスト（モック使用）
 """
 
 import json
+import tempfile
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from types import SimpleNamespace
+from unittest.mock import patch
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# anthropic モジュールをモックしてからインポート
-sys.modules['anthropic'] = MagicMock()
+from parent_company_finder import ParentCompanyFinder, ParentCompanyResult, _AimdLimiter
 
-from parent_company_finder import ParentCompanyFinder, ParentCompanyResult
+
+class _StubMessages:
+    """
+    messages.create だけを持つ軽量なスタブ（呼び出し時の引数を記録する）
+
+    response には応答テキスト・送出する例外・引数から応答を作る関数、
+    またはそれらを呼び出し順に並べたリストを指定する。
+    """
+
+    def __init__(self) -> None:
+        self.reset()
+
+    def reset(self, response=None) -> None:
+        self.response = response
+        self.calls: list[dict] = []
+
+    @property
+    def call_count(self) -> int:
+        return len(self.calls)
+
+    def create(self, **kwargs) -> SimpleNamespace:
+        self.calls.append(kwargs)
+        response = self.response
+        if isinstance(response, list):
+            response = response.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        if callable(response):
+            response = response(**kwargs)
+        return SimpleNamespace(
+            content=[SimpleNamespace(text=response)],
+            usage=SimpleNamespace(
+                input_tokens=len(kwargs["messages"][0]["content"]),
+                output_tokens=len(response)
+            )
+        )
+
+
+class _StubClient:
+    """Anthropic クライアントの代わりに使うスタブ"""
+
+    def __init__(self) -> None:
+        self.messages = _StubMessages()
 
 
 class TestParentCompanyFinder(unittest.TestCase):
     """ParentCompanyFinderのテスト（APIモック使用）"""
 
+    @classmethod
+    def setUpClass(cls) -> None:
+        """
+        Anthropic クライアントのモックはクラスで1つだけ作り、テストごとにリセットして使う
+        （anthropic.Anthropic の差し替えもクラス単位で1回だけ行う）
+        """
+        cls.shared_client = _StubClient()
+        patcher = patch('anthropic.Anthropic', return_value=cls.shared_client)
+        cls.anthropic_class = patcher.start()
+        cls.addClassCleanup(patcher.stop)
+
     def setUp(self) -> None:
         """テスト準備"""
+        self.shared_client.messages.reset()
         self.mock_response = {
             "parent_company": "株式会社セブン-イレブン・ジャパン",
             "confidence": "high",
@@ -29,49 +84,8 @@ class TestParentCompanyFinder(unittest.TestCase):
             "notes": ""
         }
 
-    @patch('parent_company_finder.Anthropic')
-    def test_find_parent_company_success(self, mock_anthropic: Mock) -> None:
-        """正常系: 親会社を正しく特定"""
-        # モックのセットアップ
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
-
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=json.dumps(self.mock_response))]
-        mock_client.messages.create.return_value = mock_message
-
-        # テスト実行
-        finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        result = finder.find_parent_company("セブンイレブン代々木", use_cache=False)
-
-        # 検証
-        self.assertEqual(result["parent_company"], "株式会社セブン-イレブン・ジャパン")
-        self.assertEqual(result["confidence"], "high")
-        self.assertFalse(result["is_individual"])
-
-    @patch('parent_company_finder.Anthropic')
-    def test_find_parent_company_with_markdown(self, mock_anthropic: Mock) -> None:
-        """マークダウンコードブロック付きレスポンスの処理"""
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
-
-        # マークダウンで囲まれたJSON
-        markdown_response = f"```json\n{json.dumps(self.mock_response)}\n```"
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=markdown_response)]
-        mock_client.messages.create.return_value = mock_message
-
-        finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        result = finder.find_parent_company("セブンイレブン", use_cache=False)
-
-        self.assertEqual(result["parent_company"], "株式会社セブン-イレブン・ジャパン")
-
-    @patch('parent_company_finder.Anthropic')
-    def test_find_parent_company_individual(self, mock_anthropic: Mock) -> None:
-        """個人事業主の可能性がある場合"""
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
-
+    def test_find_parent_company_responses(self) -> None:
+        """API の応答ごとの結果（1つのファインダーで各ケースを順に確認）"""
         individual_response = {
             "parent_company": None,
             "confidence": "low",
@@ -79,47 +93,144 @@ class TestParentCompanyFinder(unittest.TestCase):
             "is_individual": True,
             "notes": "屋号のみで法人情報なし"
         }
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=json.dumps(individual_response))]
-        mock_client.messages.create.return_value = mock_message
+        # (説明, 取引先名, 応答テキストまたは送出する例外, 期待する項目, reasoning に含まれる文字列)
+        cases = [
+            (
+                "正常系: 親会社を正しく特定",
+                "セブンイレブン代々木",
+                json.dumps(self.mock_response),
+                {"parent_company": "株式会社セブン-イレブン・ジャパン", "confidence": "high", "is_individual": False},
+                None,
+            ),
+            (
+                "マークダウンコードブロック付きレスポンスの処理",
+                "セブンイレブン",
+                f"```json\n{json.dumps(self.mock_response)}\n```",
+                {"parent_company": "株式会社セブン-イレブン・ジャパン"},
+                None,
+            ),
+            (
+                "個人事業主の可能性がある場合",
+                "山田電機商店",
+                json.dumps(individual_response),
+                {"parent_company": None, "confidence": "low", "is_individual": True},
+                None,
+            ),
+            (
+                "API エラー時の処理",
+                "テスト",
+                Exception("API Error"),
+                {"parent_company": None, "confidence": "unknown"},
+                "API エラー",
+            ),
+            (
+                "不正なJSON レスポンス",
+                "テスト",
+                "これはJSONではありません",
+                {"parent_company": None, "confidence": "unknown"},
+                "JSON解析エラー",
+            ),
+        ]
 
         finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        result = finder.find_parent_company("山田電機商店", use_cache=False)
-
-        self.assertIsNone(result["parent_company"])
-        self.assertTrue(result["is_individual"])
-        self.assertEqual(result["confidence"], "low")
-
-    @patch('parent_company_finder.Anthropic')
-    def test_find_parent_company_api_error(self, mock_anthropic: Mock) -> None:
-        """API エラー時の処理"""
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
-        mock_client.messages.create.side_effect = Exception("API Error")
+        messages = self.shared_client.messages
+        for label, name, response, expected, reasoning in cases:
+            with self.subTest(label):
+                messages.reset(response)
 
-        finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        result = finder.find_parent_company("テスト", use_cache=False)
+                result = finder.find_parent_company(name, use_cache=False)
 
-        self.assertIsNone(result["parent_company"])
-        self.assertEqual(result["confidence"], "unknown")
-        self.assertIn("API エラー", result["reasoning"])
+                for key, value in expected.items():
+                    self.assertEqual(result[key], value)
+                if reasoning:
+                    self.assertIn(reasoning, result["reasoning"])
 
-    @patch('parent_company_finder.Anthropic')
-    def test_find_parent_company_invalid_json(self, mock_anthropic: Mock) -> None:
-        """不正なJSON レスポンス"""
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
+                # 出力トークン数は1件分に絞って問い合わせる
+                max_tokens = messages.calls[-1].get("max_tokens", 0)
+                self.assertTrue(0 < max_tokens <= 512)
 
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text="これはJSONではありません")]
-        mock_client.messages.create.return_value = mock_message
+        # クライアントはタイムアウトとリトライ回数を指定して作る
+        client_kwargs = self.anthropic_class.call_args.kwargs
+        self.assertLessEqual(client_kwargs.get("timeout", float("inf")), 60)
+        self.assertLessEqual(client_kwargs.get("max_retries", float("inf")), 5)
 
+    def test_find_parent_company_known_chain(self) -> None:
+        """既知のチェーン名はAPIを呼ばずに特定（半角カナ・空白も吸収。確信度は medium）"""
         finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        result = finder.find_parent_company("テスト", use_cache=False)
-
-        self.assertIsNone(result["parent_company"])
-        self.assertEqual(result["confidence"], "unknown")
-        self.assertIn("JSON解析エラー", result["reasoning"])
+        for name in ("ｾﾌﾞﾝｲﾚﾌﾞﾝ 代々木", "セブンイレブン", "スターバックス　新宿店"):
+            with self.subTest(name):
+                result = finder.find_parent_company(name)
+                self.assertEqual(result["confidence"], "medium")
+                self.assertIsNotNone(result["parent_company"])
+        self.assertEqual(self.shared_client.messages.call_count, 0)
+
+    def test_find_parent_company_known_chain_needs_boundary(self) -> None:
+        """チェーン名に前方一致するだけの名前（別ブランド・区切りなし）はAPIに問い合わせる"""
+        messages = self.shared_client.messages
+        messages.reset(json.dumps(self.mock_response))
+        names = ["セブンイレブン代々木", "ローソンストア100 新宿", "ガスト渋谷"]
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            finder = ParentCompanyFinder(anthropic_api_key="test_key", cache_dir=cache_dir)
+            for name in names:
+                finder.find_parent_company(name)
+
+        self.assertEqual(messages.call_count, len(names))
+
+    def test_find_parent_company_cache_hit(self) -> None:
+        """2回目以降はキャッシュから返し、APIを呼ばない（別インスタンスでもディスクから引ける）"""
+        messages = self.shared_client.messages
+        messages.reset(json.dumps({**self.mock_response, "parent_company": "山田電機株式会社"}))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            finder = ParentCompanyFinder(anthropic_api_key="test_key", cache_dir=cache_dir)
+            first = finder.find_parent_company("山田電機商店", use_cache=True)
+            second = finder.find_parent_company("山田電機商店", use_cache=True)
+            from_disk = ParentCompanyFinder(
+                anthropic_api_key="test_key", cache_dir=cache_dir
+            ).find_parent_company("山田電機商店", use_cache=True)
+
+        self.assertEqual(messages.call_count, 1)
+        self.assertEqual(first["parent_company"], "山田電機株式会社")
+        self.assertEqual(second, first)
+        self.assertEqual(from_disk, first)
+
+    def test_find_parent_company_cache_expired(self) -> None:
+        """有効期間を過ぎたディスクキャッシュは使わず、APIに問い合わせ直す"""
+        messages = self.shared_client.messages
+        messages.reset(json.dumps(self.mock_response))
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            finder = ParentCompanyFinder(anthropic_api_key="test_key", cache_dir=cache_dir)
+            finder.find_parent_company("山田電機商店", use_cache=True)
+            with patch("parent_company_finder.CACHE_TTL_SECONDS", -1):
+                finder = ParentCompanyFinder(anthropic_api_key="test_key", cache_dir=cache_dir)
+                finder.find_parent_company("山田電機商店", use_cache=True)
+
+        self.assertEqual(messages.call_count, 2)
+
+    def test_legacy_json_cache(self) -> None:
+        """旧形式の JSON キャッシュは SQLite に取り込んでファイルを削除し、clear_cache も旧形式のファイルを消す"""
+        messages = self.shared_client.messages
+        legacy = {**self.mock_response, "original_name": "山田電機商店", "parent_company": "山田電機株式会社"}
+
+        with tempfile.TemporaryDirectory() as cache_dir:
+            Path(cache_dir, "0123456789abcdef0123456789abcdef.json").write_text(
+                json.dumps(legacy, ensure_ascii=False), encoding="utf-8"
+            )
+            finder = ParentCompanyFinder(anthropic_api_key="test_key", cache_dir=cache_dir)
+            result = finder.find_parent_company("山田電機商店", use_cache=True)
+            remaining = list(Path(cache_dir).glob("*.json"))
+
+            Path(cache_dir, "left_over.json").write_text("{}", encoding="utf-8")
+            cleared = finder.clear_cache()
+            remaining_after_clear = list(Path(cache_dir).glob("*.json"))
+
+        self.assertEqual(messages.call_count, 0)
+        self.assertEqual(result["parent_company"], "山田電機株式会社")
+        self.assertEqual(remaining, [])
+        self.assertEqual(cleared, 2)
+        self.assertEqual(remaining_after_clear, [])
 
     def test_init_without_api_key(self) -> None:
         """APIキーなしでの初期化はエラー"""
@@ -128,32 +239,138 @@ class TestParentCompanyFinder(unittest.TestCase):
                 ParentCompanyFinder(anthropic_api_key=None)
             self.assertIn("ANTHROPIC_API_KEY", str(context.exception))
 
-    @patch('parent_company_finder.Anthropic')
-    def test_batch_processing(self, mock_anthropic: Mock) -> None:
-        """バッチ処理のテスト"""
-        mock_client = MagicMock()
-        mock_anthropic.return_value = mock_client
+    def test_batch_processing(self) -> None:
+        """バッチ処理のテスト（既定では1回の呼び出しにまとめ、名前ごとの親会社と使用トークン数を返す）"""
+        messages = self.shared_client.messages
+        parents = {
+            "セブンイレブン": "株式会社セブン-イレブン・ジャパン",
+            "ファミマ": "株式会社ファミリーマート",
+            "ローソン": "株式会社ローソン",
+        }
 
-        mock_message = MagicMock()
-        mock_message.content = [MagicMock(text=json.dumps(self.mock_response))]
-        mock_client.messages.create.return_value = mock_message
+        def respond(**kwargs) -> str:
+            # 一括のプロンプト以外で呼ばれたら失敗させる（1件ずつの問い合わせへの退行を検出する）
+            self.assertEqual(kwargs["system"][0]["text"], ParentCompanyFinder.BATCH_SYSTEM_PROMPT)
+            listing = kwargs["messages"][0]["content"].splitlines()[1:]
+            return json.dumps([
+                {**self.mock_response, "index": i, "parent_company": parents[line.split(". ", 1)[1]]}
+                for i, line in enumerate(listing, 1)
+            ])
+
+        messages.reset(respond)
 
         finder = ParentCompanyFinder(anthropic_api_key="test_key")
-        names = ["セブンイレブン", "ファミマ", "ローソン"]
+        names = list(parents)
         results = finder.find_parent_companies_batch(names, use_cache=False)
 
-        self.assertEqual(len(results), 3)
-        self.assertEqual(mock_client.messages.create.call_count, 3)
+        self.assertEqual([r["original_name"] for r in results], names)
+        self.assertEqual([r["parent_company"] for r in results], list(parents.values()))
+        self.assertEqual(messages.call_count, 1)
+        self.assertGreater(finder.tokens_used, 0)
+
+    def test_batch_processing_one_by_one(self) -> None:
+        """batch_size=1 では1件ずつ問い合わせる（同じ名前は1回だけ。結果は入力順）"""
+        messages = self.shared_client.messages
+        messages.reset(json.dumps(self.mock_response))
+
+        finder = ParentCompanyFinder(anthropic_api_key="test_key")
+        names = ["取引先A", "取引先B", "取引先A"]
+        results = finder.find_parent_companies_batch(names, use_cache=False, batch_size=1)
+
+        self.assertEqual([r["original_name"] for r in results], names)
+        self.assertEqual(messages.call_count, 2)
+        self.assertTrue(all(call["system"][0]["text"] == ParentCompanyFinder.SYSTEM_PROMPT for call in messages.calls))
+
+    def test_batch_processing_single_prompt(self) -> None:
+        """batch_size 指定時は1回の呼び出しにまとめ、欠けた分のみ個別に問い合わせる"""
+        messages = self.shared_client.messages
+
+        batch_response = [
+            {**self.mock_response, "index": 1},
+            {**self.mock_response, "index": 3, "parent_company": "株式会社ローソン"},
+        ]
+        messages.reset([json.dumps(batch_response), json.dumps(self.mock_response)])
+
+        finder = ParentCompanyFinder(anthropic_api_key="test_key")
+        names = ["セブンイレブン", "ファミマ", "ローソン", "セブンイレブン"]
+        results = finder.find_parent_companies_batch(names, use_cache=False, batch_size=20)
+
+        self.assertEqual([r["original_name"] for r in results], names)
+        self.assertEqual(results[2]["parent_company"], "株式会社ローソン")
+        self.assertEqual(messages.call_count, 2)
+        first_call = messages.calls[0]
+        self.assertEqual(first_call["system"][0]["text"], ParentCompanyFinder.BATCH_SYSTEM_PROMPT)
+        # 出力トークン数は1件分の上限 × 件数
+        self.assertEqual(first_call["max_tokens"], 512 * 3)
+
+    def test_batch_processing_truncated_response(self) -> None:
+        """一括の回答が途中で切れて解析できない場合は、全件を1件ずつ問い合わせ直す"""
+        messages = self.shared_client.messages
+        truncated = json.dumps([{**self.mock_response, "index": 1}])[:-10]
+        messages.reset([truncated] + [json.dumps(self.mock_response)] * 3)
+
+        finder = ParentCompanyFinder(anthropic_api_key="test_key")
+        names = ["取引先A", "取引先B", "取引先C"]
+        with self.assertLogs("parent_company_finder", level="WARNING"):
+            results = finder.find_parent_companies_batch(names, use_cache=False, batch_size=20)
+
+        self.assertEqual([r["original_name"] for r in results], names)
+        self.assertTrue(all(r["parent_company"] == self.mock_response["parent_company"] for r in results))
+        self.assertEqual(messages.call_count, 4)
+
+    def test_batch_processing_non_retryable_error(self) -> None:
+        """認証エラーなど問い合わせ直しても変わらないエラーは、1件ずつ問い合わせ直さずに送出する"""
+        messages = self.shared_client.messages
+        unauthorized = Exception("invalid x-api-key")
+        unauthorized.status_code = 401
+        messages.reset(unauthorized)
+
+        finder = ParentCompanyFinder(anthropic_api_key="test_key")
+        with self.assertLogs("parent_company_finder", level="WARNING"):
+            with self.assertRaises(Exception) as context:
+                finder.find_parent_companies_batch(["取引先A", "取引先B"], use_cache=False, batch_size=20)
+
+        self.assertIs(context.exception, unauthorized)
+        self.assertEqual(messages.call_count, 1)
+
+
+class TestAimdLimiter(unittest.TestCase):
+    """同時実行数の AIMD 制御のテスト"""
+
+    def test_halves_on_rate_limit_and_recovers(self) -> None:
+        """429 で半減し、成功が続くと少しずつ戻る（上限は超えない）"""
+        limiter = _AimdLimiter(8, ceiling=10)
+
+        rate_limited = Exception("rate limited")
+        rate_limited.status_code = 429
+        with self.assertRaises(Exception):
+            with limiter:
+                raise rate_limited
+        self.assertEqual(limiter.limit, 4.0)
+
+        # 429 以外のエラーでは変えない
+        with self.assertRaises(ValueError):
+            with limiter:
+                raise ValueError("other")
+        self.assertEqual(limiter.limit, 4.0)
+
+        for _ in range(100):
+            with limiter:
+                pass
+        self.assertEqual(limiter.limit, 10.0)
 
 
 class TestCacheKey(unittest.TestCase):
     """キャッシュキー生成のテスト"""
 
-    @patch('parent_company_finder.Anthropic')
-    def test_cache_key_consistency(self, mock_anthropic: Mock) -> None:
-        """同じ入力に対して同じキャッシュキーを生成"""
-        mock_anthropic.return_value = MagicMock()
+    @classmethod
+    def setUpClass(cls) -> None:
+        patcher = patch('anthropic.Anthropic')
+        patcher.start()
+        cls.addClassCleanup(patcher.stop)
 
+    def test_cache_key_consistency(self) -> None:
+        """同じ入力に対して同じキャッシュキーを生成"""
         finder = ParentCompanyFinder(anthropic_api_key="test_key")
 
         key1 = finder._get_cache_key("テスト会社")
@@ -163,15 +380,15 @@ class TestCacheKey(unittest.TestCase):
         self.assertEqual(key1, key2)
         self.assertNotEqual(key1, key3)
 
-    @patch('parent_company_finder.Anthropic')
-    def test_cache_key_length(self, mock_anthropic: Mock) -> None:
-        """キャッシュキーは32文字（MD5ハッシュ）"""
-        mock_anthropic.return_value = MagicMock()
-
+    def test_cache_key_format(self) -> None:
+        """キャッシュキーは短い固定長の文字列（ハッシュ関数の種類には依存しない）"""
         finder = ParentCompanyFinder(anthropic_api_key="test_key")
         key = finder._get_cache_key("テスト")
+        long_key = finder._get_cache_key("テスト" * 100)
 
-        self.assertEqual(len(key), 32)
+        self.assertIsInstance(key, str)
+        self.assertTrue(8 <= len(key) <= 64)
+        self.assertEqual(len(key), len(long_key))
 
 
 if __name__ == "__main__":
@@ -2,9 +2,13 @@
 partner_linker.py のユニットテスト
 """
 
+import csv
+import os
+import tempfile
 import unittest
 import sys
 from pathlib import Path
+from unittest.mock import patch
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
@@ -125,6 +129,23 @@ class TestPartnerLinker(unittest.TestCase):
         self.assertEqual(result["status"], "skipped")
         self.assertIn("DRY RUN", result["message"])
 
+    def test_execute_links_keeps_order(self) -> None:
+        """一括実行の結果は提案と同じ順序で返る"""
+        linker = PartnerLinker(access_token="test_token", config=LinkConfig(dry_run=False))
+        proposals = [
+            linker.create_proposal(f"取引先{i}", f"新規会社{i}株式会社", None, [])
+            for i in range(5)
+        ]
+
+        def fake_create(company_id: int, name: str, corporate_number: str | None = None) -> dict:
+            return {"id": int(name[4]), "name": name}
+
+        with patch.object(linker, "_create_partner", side_effect=fake_create):
+            results = linker.execute_links(company_id=12345, proposals=proposals)
+
+        self.assertEqual([r["partner_id"] for r in results], [0, 1, 2, 3, 4])
+        self.assertTrue(all(r["status"] == "success" for r in results))
+
 
 class TestLinkReportGenerator(unittest.TestCase):
     """LinkReportGeneratorのテスト"""
@@ -159,6 +180,31 @@ class TestLinkReportGenerator(unittest.TestCase):
         self.reporter.add_result(result)
         self.assertEqual(len(self.reporter.results), 1)
 
+    def test_streaming_report(self) -> None:
+        """出力先指定時は追加と同時にCSVへ書き出し、メモリに保持しない"""
+        proposal = {
+            "transaction_name": "テスト取引",
+            "parent_company": None,
+            "corporate_number": None,
+            "action": "skip",
+            "target_partner": None,
+            "match_score": 0.0,
+            "confidence": "unknown",
+            "reason": "テスト理由"
+        }
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "proposals.csv")
+            with LinkReportGenerator(proposal_path=path) as reporter:
+                reporter.add_proposal(proposal)
+                reporter.add_proposal(proposal)
+                self.assertEqual(reporter.proposals, [])
+                self.assertEqual(reporter.generate_proposal_report(), path)
+
+            with open(path, encoding="utf-8-sig", newline="") as f:
+                rows = list(csv.reader(f))
+        self.assertEqual(len(rows), 3)
+        self.assertEqual(rows[1][0], "テスト取引")
+
 
 class TestLinkConfig(unittest.TestCase):
     """LinkConfigのテスト"""
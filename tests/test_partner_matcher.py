@@ -9,49 +9,18 @@ from pathlib import Path
 # プロジェクトルートをパスに追加
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-from partner_matcher import PartnerMatcher, MatchConfig, PartnerData
+from partner_matcher import PartnerMatcher, MatchConfig
+from tests.fixtures import TEST_PARTNERS
 
 
 class TestPartnerMatcher(unittest.TestCase):
     """PartnerMatcherのテスト"""
 
-    def setUp(self) -> None:
-        """テスト用データを準備"""
-        self.test_partners: list[PartnerData] = [
-            {
-                "id": 1,
-                "name": "株式会社セブン-イレブン・ジャパン",
-                "shortcut1": "セブンイレブン",
-                "shortcut2": None,
-                "long_name": None,
-                "corporate_number": "8011101021428"
-            },
-            {
-                "id": 2,
-                "name": "日本トイザらス株式会社",
-                "shortcut1": "トイザらス",
-                "shortcut2": None,
-                "long_name": None,
-                "corporate_number": "4010401089234"
-            },
-            {
-                "id": 3,
-                "name": "株式会社ファミリーマート",
-                "shortcut1": "ファミマ",
-                "shortcut2": "ファミリーマート",
-                "long_name": None,
-                "corporate_number": "7010001098262"
-            },
-            {
-                "id": 4,
-                "name": "スターバックス コーヒー ジャパン株式会社",
-                "shortcut1": "スタバ",
-                "shortcut2": None,
-                "long_name": "スターバックスコーヒージャパン",
-                "corporate_number": "9010401039817"
-            }
-        ]
-        self.matcher = PartnerMatcher(self.test_partners)
+    @classmethod
+    def setUpClass(cls) -> None:
+        """テスト用データを準備（マッチャーは読み取り専用としてクラスで共有する）"""
+        cls.test_partners = TEST_PARTNERS
+        cls.matcher = PartnerMatcher(cls.test_partners)
 
     def test_exact_corporate_number_match(self) -> None:
         """法人番号での完全一致テスト"""
@@ -101,6 +70,16 @@ class TestPartnerMatcher(unittest.TestCase):
         self.assertEqual(candidates[0]["partner"]["id"], 2)
         self.assertEqual(candidates[0]["match_type"], "exact_corp_num")
 
+    def test_corporate_number_match_alternatives(self) -> None:
+        """法人番号が一致した場合、alternatives 指定時のみ名前の類似候補も返す"""
+        only = self.matcher.match_by_name("ファミリーマート", corporate_number="4010401089234")
+        self.assertEqual([c["partner"]["id"] for c in only], [2])
+
+        both = self.matcher.match_by_name(
+            "ファミリーマート", corporate_number="4010401089234", alternatives=True
+        )
+        self.assertEqual([c["partner"]["id"] for c in both], [2, 3])
+
     def test_similarity_score_range(self) -> None:
         """類似度スコアが0-1の範囲であること"""
         candidates = self.matcher.match_by_name("スターバックス")
@@ -115,6 +94,44 @@ class TestPartnerMatcher(unittest.TestCase):
         candidates = matcher.match_by_name("株式会社")
         self.assertLessEqual(len(candidates), 2)
 
+    def test_match_many_parallel_keeps_order(self) -> None:
+        """並列検索の結果は入力と同じ並びで、1件ずつ検索した場合と同じ"""
+        queries = [("ファミマ", None), ("スタバ", None), ("全く違う名前", "4010401089234")]
+        expected = [PartnerMatcher(self.test_partners).match_by_name(*q) for q in queries]
+        self.assertEqual(self.matcher.match_many_parallel(queries, max_workers=2), expected)
+
+    def test_prefilter_keeps_best_match(self) -> None:
+        """2-gram での事前絞り込みを有効にしても最良の候補は変わらない"""
+        config = MatchConfig(max_candidates=1, prefilter_factor=1)
+        matcher = PartnerMatcher(self.test_partners, config)
+        candidates = matcher.match_by_name("セブンイレブン代々木")
+        self.assertEqual(candidates[0]["partner"]["id"], 1)
+
+    def test_fast_jaro_winkler(self) -> None:
+        """rapidfuzz の Jaro-Winkler を使う設定でも同じ候補が最上位になる"""
+        matcher = PartnerMatcher(self.test_partners, MatchConfig(fast_jaro_winkler=True))
+        candidates = matcher.match_by_name("セブンイレブン代々木")
+        self.assertEqual(candidates[0]["partner"]["id"], 1)
+
+    def test_repeated_query_respects_config_change(self) -> None:
+        """同じ検索の繰り返しでも、設定変更後は新しい設定で結果を返す"""
+        matcher = PartnerMatcher(self.test_partners)
+        first = matcher.match_by_name("株式会社")
+        self.assertEqual(matcher.match_by_name("株式会社"), first)
+
+        matcher.config = MatchConfig(max_candidates=1, min_score=0.1)
+        self.assertLessEqual(len(matcher.match_by_name("株式会社")), 1)
+
+    def test_match_many_same_as_match_by_name(self) -> None:
+        """一括検索の結果は1件ずつ検索した場合と同じ"""
+        names = ["セブンイレブン代々木", "ファミマ", "全く違う名前", "ファミマ"]
+        corp_nums = [None, None, "4010401089234", None]
+        expected = [
+            PartnerMatcher(self.test_partners).match_by_name(n, c)
+            for n, c in zip(names, corp_nums, strict=True)
+        ]
+        self.assertEqual(self.matcher.match_many(names, corp_nums), expected)
+
     def test_normalize_fullwidth(self) -> None:
         """全角→半角変換のテスト"""
         # 全角で検索しても半角と同様にマッチ
@@ -125,8 +142,9 @@ class TestPartnerMatcher(unittest.TestCase):
 class TestSimilarityCalculation(unittest.TestCase):
     """類似度計算のテスト"""
 
-    def setUp(self) -> None:
-        self.matcher = PartnerMatcher([])
+    @classmethod
+    def setUpClass(cls) -> None:
+        cls.matcher = PartnerMatcher([])
 
     def test_identical_strings(self) -> None:
         """同一文字列の類似度は1.0"""
@@ -148,6 +166,11 @@ class TestSimilarityCalculation(unittest.TestCase):
         score = self.matcher._jaro_winkler("テスト", "テスト")
         self.assertEqual(score, 1.0)
 
+    def test_jaro_winkler_reference_value(self) -> None:
+        """Jaro-Winkler: 定番の例（MARTHA / MARHTA）の値"""
+        score = self.matcher._jaro_winkler("martha", "marhta")
+        self.assertAlmostEqual(score, 0.9611, places=4)
+
     def test_jaro_winkler_empty(self) -> None:
         """Jaro-Winkler: 空文字列は0.0"""
         score = self.matcher._jaro_winkler("", "テスト")
@@ -2,72 +2,70 @@
 transaction_processor.py の統合テスト
 """
 
+import asyncio
 import csv
-import os
-import tempfile
+import io
+import time
 import unittest
-from unittest.mock import Mock, patch, MagicMock
+from unittest.mock import patch, MagicMock
 import sys
 from pathlib import Path
 
 sys.path.insert(0, str(Path(__file__).parent.parent))
 
-# anthropic モジュールをモックしてからインポート
-sys.modules['anthropic'] = MagicMock()
-
 from transaction_processor import (
     TransactionProcessor,
     ProcessorConfig,
     TransactionInput,
     load_transactions_from_csv
 )
-from partner_matcher import PartnerData
+from tests.fixtures import TEST_PARTNERS
 
 
 class TestTransactionProcessor(unittest.TestCase):
     """TransactionProcessorの統合テスト"""
 
-    def setUp(self) -> None:
-        """テスト準備"""
-        self.test_partners: list[PartnerData] = [
-            {
-                "id": 1,
-                "name": "株式会社セブン-イレブン・ジャパン",
-                "shortcut1": "セブンイレブン",
-                "shortcut2": None,
-                "long_name": None,
-                "corporate_number": "8011101021428"
-            },
-            {
-                "id": 2,
-                "name": "日本トイザらス株式会社",
-                "shortcut1": "トイザらス",
-                "shortcut2": None,
-                "long_name": None,
-                "corporate_number": "4010401089234"
-            }
-        ]
-
-        self.config = ProcessorConfig(
+    @classmethod
+    def setUpClass(cls) -> None:
+        """
+        エクスポーター・親会社特定のモックはクラスで1つだけ作り、テストごとにリセットして使う
+        （クラスの差し替えと取引先の読み込みもクラス単位で1回だけ行う）
+        """
+        cls.shared_exporter = MagicMock()
+        cls.shared_finder = MagicMock()
+        for target, instance in (
+            ('transaction_processor.FreeePartnerExporter', cls.shared_exporter),
+            ('transaction_processor.ParentCompanyFinder', cls.shared_finder),
+        ):
+            patcher = patch(target, return_value=instance)
+            patcher.start()
+            cls.addClassCleanup(patcher.stop)
+
+        cls.test_partners = TEST_PARTNERS
+
+        cls.config = ProcessorConfig(
             use_cache=False,
             dry_run=True,
             max_transactions=10
         )
 
-    @patch('transaction_processor.FreeePartnerExporter')
-    @patch('transaction_processor.ParentCompanyFinder')
-    def test_process_transaction_with_match(
-        self,
-        mock_finder_class: Mock,
-        mock_exporter_class: Mock
-    ) -> None:
+        # 取引先の読み込み（インデックス構築）はクラスで1回だけ行う
+        cls.shared_exporter.get_partners.return_value = cls.test_partners
+        cls.processor = TransactionProcessor(
+            freee_access_token="test_token",
+            anthropic_api_key="test_key",
+            config=cls.config
+        )
+        cls.processor.load_partners(company_id=12345)
+
+    def setUp(self) -> None:
+        """テスト準備（親会社特定のモックだけをリセットする）"""
+        self.shared_finder.reset_mock(return_value=True, side_effect=True)
+
+    def test_process_transaction_with_match(self) -> None:
         """マッチする取引先がある場合"""
         # モックセットアップ
-        mock_exporter = MagicMock()
-        mock_exporter.get_partners.return_value = self.test_partners
-        mock_exporter_class.return_value = mock_exporter
-
-        mock_finder = MagicMock()
+        mock_finder = self.shared_finder
         mock_finder.find_parent_company.return_value = {
             "original_name": "セブンイレブン代々木",
             "parent_company": "株式会社セブン-イレブン・ジャパン",
@@ -76,16 +74,8 @@ class TestTransactionProcessor(unittest.TestCase):
             "is_individual": False,
             "notes": ""
         }
-        mock_finder_class.return_value = mock_finder
 
         # テスト実行
-        processor = TransactionProcessor(
-            freee_access_token="test_token",
-            anthropic_api_key="test_key",
-            config=self.config
-        )
-        processor.load_partners(company_id=12345)
-
         transaction: TransactionInput = {
             "id": "1",
             "name": "セブンイレブン代々木",
@@ -93,26 +83,16 @@ class TestTransactionProcessor(unittest.TestCase):
             "date": "2026-01-04"
         }
 
-        result = processor.process_transaction(transaction)
+        result = self.processor.process_transaction(transaction)
 
         # 検証
         self.assertEqual(result["action"], "link")
         self.assertEqual(result["target_partner_id"], 1)
         self.assertGreater(result["match_score"], 0.5)
 
-    @patch('transaction_processor.FreeePartnerExporter')
-    @patch('transaction_processor.ParentCompanyFinder')
-    def test_process_transaction_no_match(
-        self,
-        mock_finder_class: Mock,
-        mock_exporter_class: Mock
-    ) -> None:
+    def test_process_transaction_no_match(self) -> None:
         """マッチする取引先がない場合は新規作成提案"""
-        mock_exporter = MagicMock()
-        mock_exporter.get_partners.return_value = self.test_partners
-        mock_exporter_class.return_value = mock_exporter
-
-        mock_finder = MagicMock()
+        mock_finder = self.shared_finder
         mock_finder.find_parent_company.return_value = {
             "original_name": "山田電機商店",
             "parent_company": "山田電機株式会社",
@@ -121,14 +101,6 @@ class TestTransactionProcessor(unittest.TestCase):
             "is_individual": False,
             "notes": ""
         }
-        mock_finder_class.return_value = mock_finder
-
-        processor = TransactionProcessor(
-            freee_access_token="test_token",
-            anthropic_api_key="test_key",
-            config=self.config
-        )
-        processor.load_partners(company_id=12345)
 
         transaction: TransactionInput = {
             "id": "2",
@@ -137,25 +109,15 @@ class TestTransactionProcessor(unittest.TestCase):
             "date": "2026-01-04"
         }
 
-        result = processor.process_transaction(transaction)
+        result = self.processor.process_transaction(transaction)
 
         # マッチなしなので create
         self.assertEqual(result["action"], "create")
         self.assertIsNone(result["target_partner_id"])
 
-    @patch('transaction_processor.FreeePartnerExporter')
-    @patch('transaction_processor.ParentCompanyFinder')
-    def test_process_transaction_unknown_company(
-        self,
-        mock_finder_class: Mock,
-        mock_exporter_class: Mock
-    ) -> None:
+    def test_process_transaction_unknown_company(self) -> None:
         """親会社を特定できない場合はスキップ"""
-        mock_exporter = MagicMock()
-        mock_exporter.get_partners.return_value = self.test_partners
-        mock_exporter_class.return_value = mock_exporter
-
-        mock_finder = MagicMock()
+        mock_finder = self.shared_finder
         mock_finder.find_parent_company.return_value = {
             "original_name": "不明な取引先",
             "parent_company": None,
@@ -164,14 +126,6 @@ class TestTransactionProcessor(unittest.TestCase):
             "is_individual": False,
             "notes": ""
         }
-        mock_finder_class.return_value = mock_finder
-
-        processor = TransactionProcessor(
-            freee_access_token="test_token",
-            anthropic_api_key="test_key",
-            config=self.config
-        )
-        processor.load_partners(company_id=12345)
 
         transaction: TransactionInput = {
             "id": "3",
@@ -180,47 +134,132 @@ class TestTransactionProcessor(unittest.TestCase):
             "date": "2026-01-04"
         }
 
-        result = processor.process_transaction(transaction)
+        result = self.processor.process_transaction(transaction)
 
         self.assertEqual(result["action"], "skip")
         self.assertEqual(result["status"], "skipped")
 
+    def test_process_transactions_async(self) -> None:
+        """親会社の特定は別スレッドで行い（イベントループを止めない）、結果は入力順に返す"""
+        delay = 0.05
+
+        def find_batch(names: list[str], use_cache: bool = True, batch_size: int = 1) -> list[dict]:
+            time.sleep(delay)
+            return [
+                {
+                    "original_name": name,
+                    "parent_company": "株式会社セブン-イレブン・ジャパン",
+                    "confidence": "high",
+                    "reasoning": "コンビニチェーン",
+                    "is_individual": False,
+                    "notes": ""
+                }
+                for name in names
+            ]
+
+        self.shared_finder.find_parent_companies_batch.side_effect = find_batch
+
+        transactions: list[TransactionInput] = [
+            {"id": str(i), "name": f"セブンイレブン{i}号店", "amount": None, "date": None}
+            for i in range(10)
+        ]
+
+        async def run_with_other_task() -> list:
+            results, _ = await asyncio.gather(
+                self.processor.process_transactions_async(transactions),
+                asyncio.sleep(delay)
+            )
+            return results
+
+        started = time.perf_counter()
+        results = asyncio.run(run_with_other_task())
+        elapsed = time.perf_counter() - started
+
+        self.assertEqual([r["transaction"]["id"] for r in results], [tx["id"] for tx in transactions])
+        self.assertTrue(all(r["target_partner_id"] == 1 for r in results))
+        # 特定がイベントループを止めるなら 2 × delay かかるところ、他の処理と重なって進む
+        self.assertLess(elapsed, 2 * delay)
+
+    def test_process_batch(self) -> None:
+        """一括処理は全件の親会社を特定したうえで、入力順に結果を返す（まとめて / 1件ずつ / イベントループ内）"""
+        def find(name: str, use_cache: bool = True) -> dict:
+            return {
+                "original_name": name,
+                "parent_company": None if name == "不明な取引先" else "株式会社セブン-イレブン・ジャパン",
+                "confidence": "high",
+                "reasoning": "",
+                "is_individual": False,
+                "notes": ""
+            }
+
+        self.shared_finder.find_parent_company.side_effect = find
+        self.shared_finder.find_parent_companies_batch.side_effect = (
+            lambda names, use_cache=True, batch_size=1: [find(n) for n in names]
+        )
+
+        transactions: list[TransactionInput] = [
+            {"id": "1", "name": "セブンイレブン代々木", "amount": None, "date": None},
+            {"id": "2", "name": "不明な取引先", "amount": None, "date": None},
+            {"id": "3", "name": "セブンイレブン新宿", "amount": None, "date": None},
+            {"id": "4", "name": "セブンイレブン代々木", "amount": None, "date": None},
+        ]
+
+        async def process_in_running_loop() -> list:
+            return self.processor.process_batch(transactions, company_id=12345)
+
+        # どちらの batch_size でも finder の一括特定を1回だけ呼ぶ（同名の重複排除は finder が行う）
+        for batch_size, in_loop in ((20, False), (1, False), (1, True)):
+            with self.subTest(batch_size=batch_size, in_loop=in_loop):
+                self.shared_finder.find_parent_companies_batch.reset_mock()
+                with (
+                    patch.object(self.processor.config, "batch_size", batch_size),
+                    patch("sys.stdout", new_callable=io.StringIO) as stdout
+                ):
+                    if in_loop:
+                        results = asyncio.run(process_in_running_loop())
+                    else:
+                        results = self.processor.process_batch(transactions, company_id=12345)
+
+                self.assertEqual([r["transaction"]["id"] for r in results], ["1", "2", "3", "4"])
+                self.assertEqual([r["action"] for r in results], ["link", "skip", "link", "link"])
+                self.shared_finder.find_parent_companies_batch.assert_called_once_with(
+                    [tx["name"] for tx in transactions], use_cache=False, batch_size=batch_size
+                )
+                self.shared_finder.find_parent_company.assert_not_called()
+                # 親会社の特定を始めたことは、結果の表示より前に出す
+                output = stdout.getvalue()
+                self.assertLess(output.index("3件の取引先名の親会社を特定中"), output.index("[1/4]"))
+
 
 class TestLoadTransactionsFromCSV(unittest.TestCase):
     """CSVロード機能のテスト"""
 
     def test_load_standard_csv(self) -> None:
         """標準フォーマットのCSV読み込み"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8') as f:
-            writer = csv.writer(f)
-            writer.writerow(["id", "name", "amount", "date"])
-            writer.writerow(["1", "セブンイレブン", "1000", "2026-01-04"])
-            writer.writerow(["2", "ファミマ", "500", "2026-01-04"])
-            temp_path = f.name
-
-        try:
-            transactions = load_transactions_from_csv(temp_path)
-            self.assertEqual(len(transactions), 2)
-            self.assertEqual(transactions[0]["name"], "セブンイレブン")
-            self.assertEqual(transactions[0]["amount"], 1000)
-        finally:
-            os.unlink(temp_path)
+        f = io.StringIO(newline="")
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "amount", "date"])
+        writer.writerow(["1", "セブンイレブン", "1000", "2026-01-04"])
+        writer.writerow(["2", "ファミマ", "500", "2026-01-04"])
+        f.seek(0)
+
+        transactions = load_transactions_from_csv(f)
+        self.assertEqual(len(transactions), 2)
+        self.assertEqual(transactions[0]["name"], "セブンイレブン")
+        self.assertEqual(transactions[0]["amount"], 1000)
 
     def test_load_japanese_header_csv(self) -> None:
         """日本語ヘッダーのCSV読み込み"""
-        with tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False, encoding='utf-8-sig') as f:
-            writer = csv.writer(f)
-            writer.writerow(["ID", "取引先名", "金額", "日付"])
-            writer.writerow(["1", "トイザらス", "", "2026-01-04"])
-            temp_path = f.name
-
-        try:
-            transactions = load_transactions_from_csv(temp_path)
-            self.assertEqual(len(transactions), 1)
-            # 取引先名 が name にマッピングされる
-            self.assertEqual(transactions[0]["name"], "トイザらス")
-        finally:
-            os.unlink(temp_path)
+        f = io.StringIO(newline="")
+        writer = csv.writer(f)
+        writer.writerow(["ID", "取引先名", "金額", "日付"])
+        writer.writerow(["1", "トイザらス", "", "2026-01-04"])
+        f.seek(0)
+
+        transactions = load_transactions_from_csv(f)
+        self.assertEqual(len(transactions), 1)
+        # 取引先名 が name にマッピングされる
+        self.assertEqual(transactions[0]["name"], "トイザらス")
 
 
 class TestProcessorConfig(unittest.TestCase):
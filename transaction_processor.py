@@ -11,16 +11,26 @@
 5. 確認後、実行
 """
 
+import asyncio
 import csv
 import os
 import sys
+import time
+from collections import Counter
+from contextlib import nullcontext
 from dataclasses import dataclass
 from datetime import datetime
-from typing import TypedDict
+from typing import TextIO, TypedDict
 
 from batch_export import FreeePartnerExporter
-from parent_company_finder import ParentCompanyFinder, ParentCompanyResult
-from partner_matcher import PartnerMatcher, MatchConfig, PartnerData
+from constants import CSV_BUFFER_SIZE, PRINT_BATCH_SIZE
+from parent_company_finder import (
+    BATCH_PROMPT_SIZE,
+    MAX_CONCURRENT_REQUESTS,
+    ParentCompanyFinder,
+    ParentCompanyResult
+)
+from partner_matcher import PartnerMatcher, MatchConfig, MatchCandidate, PartnerData
 from partner_linker import PartnerLinker, LinkConfig, LinkReportGenerator
 from logger import get_logger
 from exceptions import (
@@ -39,7 +49,11 @@ class TransactionInput(TypedDict):
 
 
 class ProcessResult(TypedDict):
-    """処理結果"""
+    """
+    処理結果
+
+    1件の結果は表示・CSV 出力で数回参照されるだけなので、他の結果型と同じく TypedDict で扱う
+    """
     transaction: TransactionInput
     parent_company: ParentCompanyResult
     match_score: float
@@ -54,10 +68,13 @@ class ProcessResult(TypedDict):
 class ProcessorConfig:
     """処理設定"""
     use_cache: bool = True              # 親会社特定のキャッシュを使用
+    clear_cache: bool = False           # 開始時に親会社特定のキャッシュを削除
     auto_link_threshold: float = 0.9    # 自動紐付け閾値
     suggest_threshold: float = 0.6      # 提案表示閾値
     dry_run: bool = True                # ドライラン
     max_transactions: int = 0           # 最大処理件数（0=無制限）
+    max_concurrency: int = MAX_CONCURRENT_REQUESTS  # 親会社特定（API 呼び出し）の同時実行数の初期値
+    batch_size: int = BATCH_PROMPT_SIZE # 1回の API 呼び出しで問い合わせる件数（1=1件ずつ）
 
 
 class TransactionProcessor:
@@ -93,7 +110,10 @@ class TransactionProcessor:
         self.exporter = FreeePartnerExporter(freee_access_token)
 
         # 親会社特定
-        self.finder = ParentCompanyFinder(anthropic_api_key)
+        # 同時実行数の制御は finder に任せる（429 の発生状況に応じて増減する）
+        self.finder = ParentCompanyFinder(anthropic_api_key, max_concurrency=self.config.max_concurrency)
+        if self.config.clear_cache:
+            self.finder.clear_cache()
 
         # 紐付け
         link_config = LinkConfig(
@@ -113,26 +133,32 @@ class TransactionProcessor:
         """freee取引先をロードしてインデックス化"""
         self.logger.info("freee取引先を読み込み中...")
         print("📥 freee取引先を読み込み中...")
+        # 2ページ目以降は FreeePartnerExporter.iter_partners がスレッドで並列に取得する
         partners_raw = self.exporter.get_partners(company_id)
 
-        # PartnerData形式に変換
+        # PartnerData形式に変換（法人番号ありの件数も同じ走査で数える）
         partners: list[PartnerData] = []
+        with_corp = 0
         for p in partners_raw:
+            corp_num = p.get("corporate_number")
+            if corp_num:
+                with_corp += 1
             partners.append({
                 "id": p["id"],
                 "name": p["name"],
                 "shortcut1": p.get("shortcut1"),
                 "shortcut2": p.get("shortcut2"),
                 "long_name": p.get("long_name"),
-                "corporate_number": p.get("corporate_number")
+                "corporate_number": corp_num
             })
 
+        # 法人番号・正規化済みの名前のインデックスは PartnerMatcher の初期化時に1回だけ作られ、
+        # 完全一致した場合は類似度の計算を行わずに返る
         self.matcher = PartnerMatcher(partners, MatchConfig(
             min_score=self.config.suggest_threshold
         ))
 
         total = len(partners)
-        with_corp = sum(1 for p in partners if p.get("corporate_number"))
         self.logger.info(f"{total}件の取引先をロード（法人番号あり: {with_corp}件）")
         print(f"   ✅ {total}件の取引先をロード（法人番号あり: {with_corp}件）")
 
@@ -149,14 +175,26 @@ class TransactionProcessor:
         Returns:
             処理結果
         """
-        tx_name = transaction["name"]
-
         # Step 1: 親会社を特定
         parent_result = self.finder.find_parent_company(
-            tx_name,
+            transaction["name"],
             use_cache=self.config.use_cache
         )
 
+        return self._process_with_parent(transaction, parent_result)
+
+    def _process_with_parent(
+        self,
+        transaction: TransactionInput,
+        parent_result: ParentCompanyResult,
+        candidates: list[MatchCandidate] | None = None
+    ) -> ProcessResult:
+        """
+        親会社の特定結果を元に、マッチングと紐付け提案の作成を行う
+
+        candidates を渡した場合は、それを親会社名のマッチング結果として使う
+        """
+        tx_name = transaction["name"]
         parent_company = parent_result["parent_company"]
         confidence = parent_result["confidence"]
 
@@ -185,7 +223,8 @@ class TransactionProcessor:
                 "message": "取引先インデックスが未初期化です"
             }
 
-        candidates = self.matcher.match_by_name(parent_company)
+        if candidates is None:
+            candidates = self.matcher.match_by_name(parent_company)
 
         # Step 3: 紐付け提案を作成
         proposal = self.linker.create_proposal(
@@ -210,6 +249,61 @@ class TransactionProcessor:
             "message": proposal["reason"]
         }
 
+    async def process_transactions_async(
+        self,
+        transactions: list[TransactionInput]
+    ) -> list[ProcessResult]:
+        """
+        複数の取引を処理（イベントループを止めずに親会社を特定する）
+
+        親会社の特定は process_batch と同じ経路（finder のスレッドプール）で別スレッドから行い、
+        マッチングと紐付け提案の作成は入力順に行う。
+
+        Args:
+            transactions: 処理対象の取引リスト
+
+        Returns:
+            処理結果リスト（入力順）
+        """
+        parent_results = await asyncio.to_thread(self._find_parents, transactions)
+        return self._process_with_parents(transactions, parent_results)
+
+    def _find_parents(self, transactions: list[TransactionInput]) -> list[ParentCompanyResult]:
+        """
+        取引ごとの親会社を特定する（結果は入力順）
+
+        batch_size 件ずつ1回の呼び出しにまとめるか（batch_size > 1）、1件ずつ並列に問い合わせる。
+        同時実行数は finder が制御し、同じ取引先名の問い合わせは1回だけ行う
+        """
+        return self.finder.find_parent_companies_batch(
+            [tx["name"] for tx in transactions],
+            use_cache=self.config.use_cache,
+            batch_size=self.config.batch_size
+        )
+
+    def _process_with_parents(
+        self,
+        transactions: list[TransactionInput],
+        parent_results: list[ParentCompanyResult]
+    ) -> list[ProcessResult]:
+        """
+        親会社の特定結果を元に複数の取引を処理（入力順）
+
+        特定できた親会社名は match_many でまとめてマッチングする
+        （rapidfuzz + numpy があれば距離を行列として一括計算する）
+        """
+        matched: dict[str, list[MatchCandidate]] = {}
+        if self.matcher:
+            names = list(dict.fromkeys(
+                r["parent_company"] for r in parent_results if r["parent_company"]
+            ))
+            matched = dict(zip(names, self.matcher.match_many(names), strict=True))
+
+        return [
+            self._process_with_parent(tx, parent_result, matched.get(parent_result["parent_company"]))
+            for tx, parent_result in zip(transactions, parent_results, strict=True)
+        ]
+
     def process_batch(
         self,
         transactions: list[TransactionInput],
@@ -228,28 +322,38 @@ class TransactionProcessor:
         # 取引先をロード
         self.load_partners(company_id)
 
-        results: list[ProcessResult] = []
-        total = len(transactions)
-
         if self.config.max_transactions > 0:
             transactions = transactions[:self.config.max_transactions]
             print(f"\n⚠️  処理件数制限: {self.config.max_transactions}件")
 
         print(f"\n🔄 {len(transactions)}件の取引を処理中...\n")
 
-        for i, tx in enumerate(transactions, 1):
-            print(f"[{i}/{len(transactions)}] {tx['name'][:30]}...")
-
-            result = self.process_transaction(tx)
-            results.append(result)
+        # 親会社の特定（API 呼び出し）は先にまとめて行い、マッチング以降は入力順に処理する
+        # （イベントループを使わないため、実行中のイベントループの中から呼び出してもよい）
+        # API 待ちの間も状況が分かるよう、特定の開始と完了はすぐに表示する
+        unique_names = len({tx["name"] for tx in transactions})
+        print(f"🔍 {unique_names}件の取引先名の親会社を特定中...", flush=True)
+        started = time.perf_counter()
+        parent_results = self._find_parents(transactions)
+        print(f"   特定完了（{time.perf_counter() - started:.1f}秒）\n", flush=True)
+        results = self._process_with_parents(transactions, parent_results)
+
+        # マッチング結果の表示（PRINT_BATCH_SIZE 件ごとにまとめて書き出す）
+        total = len(transactions)
+        lines: list[str] = []
+        for i, (tx, result) in enumerate(zip(transactions, results, strict=True), 1):
+            lines.append(f"[{i}/{total}] {tx['name'][:30]}...")
 
-            # 簡易進捗表示
             if result["action"] == "link":
-                print(f"   → 🔗 {result['target_partner_name']} (スコア: {result['match_score']:.2f})")
+                lines.append(f"   → 🔗 {result['target_partner_name']} (スコア: {result['match_score']:.2f})")
             elif result["action"] == "create":
-                print(f"   → ➕ 新規作成推奨: {result['parent_company']['parent_company']}")
+                lines.append(f"   → ➕ 新規作成推奨: {result['parent_company']['parent_company']}")
             else:
-                print(f"   → ⏭️ スキップ: {result['message'][:40]}")
+                lines.append(f"   → ⏭️ スキップ: {result['message'][:40]}")
+
+            if i % PRINT_BATCH_SIZE == 0 or i == total:
+                sys.stdout.write("\n".join(lines) + "\n")
+                lines.clear()
 
         return results
 
@@ -272,7 +376,7 @@ class TransactionProcessor:
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
             output_path = f"transaction_results_{timestamp}.csv"
 
-        with open(output_path, "w", encoding="utf-8-sig", newline="") as f:
+        with open(output_path, "w", encoding="utf-8-sig", newline="", buffering=CSV_BUFFER_SIZE) as f:
             writer = csv.writer(f)
             writer.writerow([
                 "取引ID",
@@ -287,8 +391,8 @@ class TransactionProcessor:
                 "メッセージ"
             ])
 
-            for r in results:
-                writer.writerow([
+            writer.writerows(
+                (
                     r["transaction"]["id"],
                     r["transaction"]["name"],
                     r["parent_company"]["parent_company"] or "",
@@ -299,7 +403,9 @@ class TransactionProcessor:
                     f"{r['match_score']:.2f}",
                     r["status"],
                     r["message"]
-                ])
+                )
+                for r in results
+            )
 
         print(f"\n📄 結果をエクスポート: {output_path}")
         return output_path
@@ -307,9 +413,7 @@ class TransactionProcessor:
     def print_summary(self, results: list[ProcessResult]) -> None:
         """サマリーを表示"""
         total = len(results)
-        actions = {}
-        for r in results:
-            actions[r["action"]] = actions.get(r["action"], 0) + 1
+        actions = Counter(r["action"] for r in results)
 
         print("\n" + "=" * 50)
         print("📊 処理結果サマリー")
@@ -325,29 +429,65 @@ class TransactionProcessor:
         self.reporter.print_summary()
 
 
-def load_transactions_from_csv(csv_path: str) -> list[TransactionInput]:
-    """CSVから取引を読み込み"""
+def _column(columns: dict[str, int], *names: str) -> int | None:
+    """ヘッダーの候補名のうち、最初に見つかった列の位置"""
+    return next((columns[name] for name in names if name in columns), None)
+
+
+def _cell(row: list[str], column: int | None, default: str | None = None) -> str | None:
+    """行の値（列がなければ default、行が短ければ csv.DictReader と同じく None）"""
+    if column is None:
+        return default
+    return row[column] if column < len(row) else None
+
+
+def load_transactions_from_csv(csv_path: str | TextIO) -> list[TransactionInput]:
+    """
+    CSVから取引を読み込み（パスの代わりに開いたテキストストリームも渡せる）
+
+    行ごとに辞書を作らないよう、列の位置をヘッダーから1回だけ求めて csv.reader で読む
+    （列名の扱いは csv.DictReader で読んでいたときと同じ）
+    """
     transactions: list[TransactionInput] = []
     logger = get_logger("transaction_processor")
 
+    file_path = csv_path if isinstance(csv_path, str) else getattr(csv_path, "name", None)
+
     try:
-        with open(csv_path, "r", encoding="utf-8-sig") as f:
-            reader = csv.DictReader(f)
-            for row_num, row in enumerate(reader, start=2):
-                name = row.get("name", row.get("取引先名", row.get("取引先", "")))
+        if isinstance(csv_path, str):
+            source = open(csv_path, "r", encoding="utf-8-sig")
+        else:
+            source = nullcontext(csv_path)
+        with source as f:
+            reader = csv.reader(f)
+            # 同じ列名が複数ある場合は DictReader と同じく後の列を使う
+            columns = {name: i for i, name in enumerate(next(reader, []))}
+            name_col = _column(columns, "name", "取引先名", "取引先")
+            id_col = _column(columns, "id", "ID")
+            amount_col = _column(columns, "amount")
+            date_col = _column(columns, "date", "日付")
+
+            row_num = 1
+            for row in reader:
+                # 空行は DictReader と同じく行番号に数えずに飛ばす
+                if not row:
+                    continue
+                row_num += 1
+                name = _cell(row, name_col, "")
                 if not name:
                     logger.warning(f"行{row_num}: 取引先名が空のためスキップ")
                     continue
+                amount = _cell(row, amount_col)
                 transactions.append({
-                    "id": row.get("id", row.get("ID", str(row_num))),
+                    "id": _cell(row, id_col, str(row_num)),
                     "name": name,
-                    "amount": int(row["amount"]) if row.get("amount") else None,
-                    "date": row.get("date", row.get("日付"))
+                    "amount": int(amount) if amount else None,
+                    "date": _cell(row, date_col)
                 })
     except FileNotFoundError:
-        raise DataFormatError(f"ファイルが見つかりません", csv_path)
+        raise DataFormatError(f"ファイルが見つかりません", file_path)
     except csv.Error as e:
-        raise DataFormatError(f"CSV解析エラー: {e}", csv_path)
+        raise DataFormatError(f"CSV解析エラー: {e}", file_path)
 
     logger.info(f"{len(transactions)}件の取引を読み込み")
     return transactions